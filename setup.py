@@ -1,5 +1,9 @@
 # -*- coding: utf-8 -*-
+from distutils.cmd import Command
+from distutils.errors import DistutilsError
 from setuptools import setup, find_packages
+from setuptools.command.build_py import build_py
+from setuptools.command.sdist import sdist
 import os
 
 version = '0.3dev'
@@ -8,6 +12,65 @@ version = '0.3dev'
 def read(*rnames):
     return open(os.path.join(os.path.dirname(__file__), *rnames)).read()
 
+
+def load_catalogs():
+    """Load ``catalogs.py`` without importing the package."""
+    path = os.path.join(
+        os.path.dirname(__file__), 'src', 'z3c', 'formwidget', 'unit',
+        'catalogs.py')
+    namespace = {'__file__': path, '__name__': 'catalogs'}
+    exec(compile(open(path).read(), path, 'exec'), namespace)
+    return namespace
+
+
+class compile_catalogs(Command):
+    """Compile the outdated gettext catalogs."""
+
+    description = 'compile the gettext catalogs (.po -> .mo)'
+    user_options = [
+        ('check', None, 'fail if a catalog is outdated, compile nothing'),
+    ]
+    boolean_options = ['check']
+
+    def initialize_options(self):
+        self.check = False
+
+    def finalize_options(self):
+        pass
+
+    def run(self):
+        catalogs = load_catalogs()
+        if not self.check and not catalogs['can_compile']():
+            # Don't fail builds, the catalogs are read with or without.
+            self.warn('python-gettext is not installed, the catalogs are '
+                      'not compiled')
+            return
+        if self.check:
+            outdated = catalogs['outdated_catalogs']()
+            if outdated:
+                raise DistutilsError('Outdated catalogs: %s' % ', '.join(
+                    po_path for language, domain, po_path, mo_path
+                    in outdated))
+            return
+        for language, domain, po_path, mo_path in \
+                catalogs['compile_catalogs']():
+            self.announce('compiled %s' % mo_path, level=2)
+
+
+class build_py_catalogs(build_py):
+
+    def run(self):
+        self.run_command('compile_catalogs')
+        build_py.run(self)
+
+
+class sdist_catalogs(sdist):
+
+    def run(self):
+        self.run_command('compile_catalogs')
+        sdist.run(self)
+
+
 long_description = (
     read('README.rst')
     + '\n' +
@@ -41,10 +104,20 @@ setup(
     zip_safe=False,
     include_package_data=True,
     extras_require=dict(
+        catalog=[
+            'zope.catalog',
+            'zope.index',
+        ],
         fanstatic=[
             'js.bootstrap_select',
         ],
+        numpy=[
+            'numpy',
+        ],
         test=[
+            'ZODB',
+            'python-gettext',
+            'zope.catalog',
             'unittest2',
             'z3c.form [test]',
             'zc.buildout',
@@ -60,7 +133,15 @@ setup(
     ],
     entry_points="""
     # -*- Entry points: -*-
+    [console_scripts]
+    unit-snapshot = z3c.formwidget.unit.snapshot:main
+    unit-convert = z3c.formwidget.unit.bulk:main
     """,
+    cmdclass={
+        'build_py': build_py_catalogs,
+        'compile_catalogs': compile_catalogs,
+        'sdist': sdist_catalogs,
+    },
     message_extractors={"src": [
         ('**.py', 'lingua_python', None),
         ('**.pt', 'lingua_xml', None),
@@ -1,10 +1,46 @@
 """A multi unit widget for z3c.form."""
 
 # python imports
-from pint import UnitRegistry
 import os
+import threading
 
-ureg = UnitRegistry()
-ureg.load_definitions(
-    os.path.join(os.path.dirname(__file__), 'pint_units.txt')
-)
+DEFINITIONS = os.path.join(os.path.dirname(__file__), 'pint_units.txt')
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Return the pint ``UnitRegistry``, create it on first use."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                from pint import UnitRegistry
+                registry = UnitRegistry()
+                registry.load_definitions(DEFINITIONS)
+                _registry = registry
+    return _registry
+
+
+class LazyUnitRegistry(object):
+    """Stand-in for the pint ``UnitRegistry``.
+
+    Parsing pint's definitions is expensive, so the registry is only created
+    when it is used for the first time.
+    """
+
+    def __getattr__(self, name):
+        return getattr(get_registry(), name)
+
+    def __getitem__(self, name):
+        return get_registry()[name]
+
+    def __contains__(self, name):
+        return name in get_registry()
+
+    def __call__(self, *args, **kwargs):
+        return get_registry()(*args, **kwargs)
+
+
+ureg = LazyUnitRegistry()
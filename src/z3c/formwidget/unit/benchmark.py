@@ -0,0 +1,502 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks for z3c.formwidget.unit.
+
+Run with ``python -m z3c.formwidget.unit.benchmark``, see ``--help`` for
+the options. The suite can also run in the test runner (see ``tests``), set
+the environment variable ``Z3C_FORMWIDGET_UNIT_BENCHMARK`` to ``1`` or to the
+path of a baseline file.
+"""
+
+# python imports
+from decimal import Decimal
+import gc
+import json
+import optparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import timeit
+
+# zope imports
+from z3c.form import field, form
+from z3c.form.interfaces import IFormLayer
+from z3c.form.widget import FieldWidget
+from zope.interface import implementer
+from zope.publisher.browser import TestRequest
+import zope.schema
+
+# local imports
+from z3c.formwidget.unit import catalogs, conversion, parser, snapshot
+from z3c.formwidget.unit import ureg, utils
+from z3c.formwidget.unit.widget import AreaFieldWidget, AreaWidget
+from z3c.formwidget.unit.widget import LengthFieldWidget
+
+
+NUMBER = 10000
+ENVIRONMENT_KEY = 'Z3C_FORMWIDGET_UNIT_BENCHMARK'
+
+CONVERSIONS = [
+    (Decimal('5000.5'), 'sq_m', 'ha'),
+    (12345.6, 'sq_m', 'acre'),
+    (Decimal('3'), 'ft', 'm'),
+    (1500, 'm', 'km'),
+]
+
+# The locales of the shipped translations.
+LOCALES = tuple(sorted(set(
+    language for language, domain, po_path, mo_path
+    in catalogs.find_catalogs())))
+
+# Inputs for the parser and the equivalent pint expressions.
+QUANTITIES = [
+    (u'1.5 km', 'length', '1.5 km'),
+    (u'12 ft 3 in', 'length', '12 ft + 3 in'),
+    (u'2 acre', 'area', '2 acre'),
+]
+
+
+def convert_pint(value, from_unit, to_unit):
+    """The conversion as it was done before the conversion table."""
+    value = value * getattr(ureg, from_unit)
+    return value.to(getattr(ureg, to_unit)).magnitude
+
+
+def run(func, number=NUMBER):
+    """Return the operations per second of ``func``."""
+    timer = timeit.Timer(func)
+    return number / min(timer.repeat(repeat=3, number=number))
+
+
+def measure_allocations(func):
+    """Return the number of objects one call of ``func`` leaves behind.
+
+    Only objects tracked by the garbage collector are counted, including
+    garbage in reference cycles. Objects freed during the call are not.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        gc.collect()
+        before = len(gc.get_objects())
+        func()
+        return len(gc.get_objects()) - before
+    finally:
+        if enabled:
+            gc.enable()
+
+
+@implementer(IFormLayer)
+class BenchmarkRequest(TestRequest):
+    """A request of the form layer."""
+
+
+# The benchmark suite: (name, number of runs, factory) tuples. The factory
+# returns the function to measure.
+SUITE = []
+
+
+def benchmark(name, number=1000):
+    """Register a benchmark factory for the suite."""
+    def decorator(factory):
+        SUITE.append((name, number, factory))
+        return factory
+    return decorator
+
+
+AREA = zope.schema.Decimal(__name__='area', title=u'Area', required=False)
+
+
+def _widget(mode='input', fast_display=False, select_cache=True,
+            format_cache=True, **values):
+    widget = FieldWidget(AREA, AreaWidget(BenchmarkRequest(form=values)))
+    widget.ignoreContext = True
+    widget.mode = mode
+    widget.fast_display = fast_display
+    widget.select_cache = select_cache
+    widget.format_cache = format_cache
+    widget.value = u'12345'
+    return widget
+
+
+@benchmark('render input widget')
+def bench_render_input():
+    return lambda: _widget().render()
+
+
+@benchmark('render input widget (TAL options)')
+def bench_render_input_tal():
+    return lambda: _widget(select_cache=False).render()
+
+
+@benchmark('render display widget')
+def bench_render_display():
+    return lambda: _widget(mode='display').render()
+
+
+@benchmark('render display widget (fast)')
+def bench_render_display_fast():
+    return lambda: _widget(mode='display', fast_display=True).render()
+
+
+@benchmark('render form (50 widgets)', number=20)
+def bench_render_form():
+    fields = []
+    values = {}
+    for i in range(50):
+        name = 'field%d' % i
+        fields.append(field.Field(
+            zope.schema.Decimal(__name__=name, title=u'Field', required=False)
+        ))
+        fields[-1].widgetFactory = i % 2 and AreaFieldWidget or \
+            LengthFieldWidget
+        values['form.widgets.' + name] = u'%d' % (i * 997)
+
+    class BenchmarkForm(form.Form):
+        ignoreContext = True
+
+    BenchmarkForm.fields = field.Fields(*fields)
+
+    def render():
+        benchmark_form = BenchmarkForm(None, BenchmarkRequest(form=values))
+        benchmark_form.update()
+        for widget in benchmark_form.widgets.values():
+            widget.render()
+    return render
+
+
+def _widget_value(widget):
+    # Drop the value cached on the widget, like a new widget would.
+    widget._cache = None
+    return widget.widget_value
+
+
+@benchmark('widget value', number=NUMBER)
+def bench_widget_value():
+    widget = _widget(mode='display')
+    return lambda: _widget_value(widget)
+
+
+@benchmark('widget value (no format cache)', number=NUMBER)
+def bench_widget_value_uncached():
+    widget = _widget(mode='display', format_cache=False)
+    return lambda: _widget_value(widget)
+
+
+@benchmark('extract with conversion')
+def bench_extract():
+    return lambda: _widget(**{'area': u'2', 'area-unit': 'acre'}).extract()
+
+
+@benchmark('unit options')
+def bench_items():
+    return lambda: _widget().items()
+
+
+@benchmark('convert Decimal', number=NUMBER)
+def bench_convert_decimal():
+    return lambda: conversion.convert(Decimal('5000.5'), 'sq_m', 'ha')
+
+
+@benchmark('convert float', number=NUMBER)
+def bench_convert_float():
+    return lambda: conversion.convert(12345.6, 'sq_m', 'acre')
+
+
+@benchmark('parse quantity', number=NUMBER)
+def bench_parse():
+    return lambda: parser.parse(u'12 ft 3 in', 'length')
+
+
+@benchmark('get_best_unit', number=NUMBER)
+def bench_get_best_unit():
+    return lambda: utils.get_best_unit(12345.6, 'imperial', 'area')
+
+
+def run_suite(scale=1.0):
+    """Run the benchmark suite.
+
+    Return a list of (name, operations per second, objects) tuples, see
+    ``measure_allocations``. ``scale`` scales the number of runs of every
+    benchmark.
+    """
+    from z3c.formwidget.unit import tests
+    setup = tests.setUpComponents()
+    try:
+        results = []
+        for name, number, factory in SUITE:
+            func = factory()
+            func()
+            number = max(1, int(number * scale))
+            results.append((name, run(func, number), measure_allocations(func)))
+        return results
+    finally:
+        tests.tearDown(setup)
+
+
+def load_baseline(path):
+    with open(path) as baseline_file:
+        return json.load(baseline_file)
+
+
+def save_baseline(results, path):
+    with open(path, 'w') as baseline_file:
+        json.dump(
+            dict((name, ops) for name, ops, allocations in results),
+            baseline_file, indent=1, sort_keys=True)
+
+
+def check_baseline(results, baseline, tolerance=0.8):
+    """Return the results which are slower than the baseline allows.
+
+    A result fails if it is below ``tolerance`` times the baseline.
+    """
+    failures = []
+    for name, ops, allocations in results:
+        expected = baseline.get(name)
+        if expected is not None and ops < expected * tolerance:
+            failures.append((name, ops, expected))
+    return failures
+
+
+def print_suite(results):
+    print('%-32s %14s %14s' % ('benchmark', 'ops/s', 'objects'))
+    for name, ops, allocations in results:
+        print('%-32s %14.0f %14d' % (name, ops, allocations))
+
+
+def bench_conversion(number=NUMBER):
+    """Compare the conversion table with pint's quantity arithmetic."""
+    results = []
+    for value, from_unit, to_unit in CONVERSIONS:
+        def table():
+            conversion.convert(value, from_unit, to_unit)
+
+        def pint():
+            convert_pint(value, from_unit, to_unit)
+
+        # Build the caches before measuring.
+        table()
+        pint()
+        name = '%s %s -> %s' % (type(value).__name__, from_unit, to_unit)
+        results.append((name, run(pint, number), run(table, number)))
+    return results
+
+
+def bench_parser(number=NUMBER):
+    """Compare the quantity parser with pint's expression parser."""
+    results = []
+    for text, dimension, expression in QUANTITIES:
+        base_unit = getattr(ureg, utils.interfaces.BASE_UNITS[dimension])
+
+        def parse():
+            parser.parse(text, dimension)
+
+        def pint():
+            ureg.parse_expression(expression).to(base_unit).magnitude
+
+        parse()
+        pint()
+        results.append((text, run(pint, number), run(parse, number)))
+    return results
+
+
+def bench_batch(size=10000, number=10):
+    """Compare ``utils.convert_many`` with one conversion per value."""
+    values = [(i * 7919) % 10000000 for i in range(size)]
+
+    def single():
+        for value in values:
+            unit = utils.get_best_unit(value, 'metric', 'area')[0]
+            conversion.convert(value, 'sq_m', unit)
+
+    def python():
+        utils.convert_many(values, 'metric', 'area', use_numpy=False)
+
+    results = [
+        ('single values', run(single, number) * size),
+        ('convert_many (Python)', run(python, number) * size),
+    ]
+    if utils.HAS_NUMPY:
+        array = utils.numpy.array(values, dtype=float)
+
+        def vectorized():
+            utils.convert_many(array, 'metric', 'area', use_numpy=True)
+
+        results.append(
+            ('convert_many (NumPy)', run(vectorized, number) * size))
+    return results
+
+
+def bench_locales(number=NUMBER):
+    """Compare z3c.form's decimal converter with the shared formatters.
+
+    Every run creates a converter, like every request does, and parses and
+    formats a value in the locale. Return a list of (language, z3c.form
+    ops/s, shared formatter ops/s) tuples.
+    """
+    from z3c.form.converter import DecimalDataConverter
+    from z3c.formwidget.unit import tests
+    from z3c.formwidget.unit.converter import UnitDecimalDataConverter
+    setup = tests.setUpComponents()
+    try:
+        results = []
+        for language in LOCALES:
+            widget = FieldWidget(AREA, AreaWidget(
+                BenchmarkRequest(HTTP_ACCEPT_LANGUAGE=language)))
+            text = DecimalDataConverter(AREA, widget).toWidgetValue(
+                Decimal('12345.67'))
+
+            def convert(factory=DecimalDataConverter):
+                converter = factory(AREA, widget)
+                converter.toWidgetValue(converter.toFieldValue(text))
+
+            def shared():
+                convert(UnitDecimalDataConverter)
+
+            shared()
+            results.append(
+                (language, run(convert, number), run(shared, number)))
+        return results
+    finally:
+        tests.tearDown(setup)
+
+
+def bench_threads(threads=(1, 2, 4, 8), size=20000):
+    """Measure the conversions per second of growing thread pools.
+
+    Return a list of (number of threads, conversions per second) tuples.
+    """
+    from multiprocessing.pool import ThreadPool
+    conversions = [CONVERSIONS[i % len(CONVERSIONS)] for i in range(size)]
+
+    def convert(args):
+        return conversion.convert(*args)
+
+    results = []
+    for count in threads:
+        pool = ThreadPool(count)
+        try:
+            pool.map(convert, conversions[:100])
+            start = timeit.default_timer()
+            pool.map(convert, conversions, chunksize=100)
+            elapsed = timeit.default_timer() - start
+        finally:
+            pool.close()
+            pool.join()
+        results.append((count, size / elapsed))
+    return results
+
+
+STARTUP_SCRIPT = """
+import time
+start = time.time()
+import z3c.formwidget.unit.widget
+imported = time.time()
+from z3c.formwidget.unit import conversion
+conversion.convert(1, 'ft', 'm')
+converted = time.time()
+print('%f %f' % (imported - start, converted - imported))
+"""
+
+
+def measure_startup(environ=None, repeat=5):
+    """Return the best import and first conversion times of a new process."""
+    env = dict(os.environ)
+    env.update(environ or {})
+    results = []
+    for i in range(repeat):
+        output = subprocess.Popen(
+            [sys.executable, '-c', STARTUP_SCRIPT], env=env,
+            stdout=subprocess.PIPE).communicate()[0]
+        results.append([float(part) for part in output.split()])
+    return min(r[0] for r in results), min(r[1] for r in results)
+
+
+def bench_startup():
+    """Measure the import time and the latency of the first conversion."""
+    tmpdir = tempfile.mkdtemp()
+    path = os.path.join(tmpdir, 'units.json')
+    try:
+        snapshot.dump(conversion.build_factors(), path)
+        return [
+            ('without snapshot', measure_startup({
+                snapshot.ENVIRONMENT_KEY: os.path.join(tmpdir, 'missing'),
+            })),
+            ('with snapshot', measure_startup({
+                snapshot.ENVIRONMENT_KEY: path,
+            })),
+        ]
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+def print_comparisons():
+    print('%-32s %14s %14s %9s' % ('conversion', 'pint ops/s', 'table ops/s',
+                                   'speedup'))
+    for name, pint, table in bench_conversion():
+        print('%-32s %14.0f %14.0f %8.1fx' % (name, pint, table, table / pint))
+    print('')
+    print('%-32s %14s %14s %9s' % ('parsing', 'pint ops/s', 'parser ops/s',
+                                   'speedup'))
+    for name, pint, parse in bench_parser():
+        print('%-32s %14.0f %14.0f %8.1fx' % (name, pint, parse, parse / pint))
+    print('')
+    print('%-32s %14s %14s %9s' % ('number format', 'z3c.form ops/s',
+                                   'shared ops/s', 'speedup'))
+    for name, default, shared in bench_locales():
+        print('%-32s %14.0f %14.0f %8.1fx' % (name, default, shared,
+                                              shared / default))
+    print('')
+    print('%-32s %14s' % ('threads', 'conversions/s'))
+    for count, ops in bench_threads():
+        print('%-32d %14.0f' % (count, ops))
+    print('')
+    print('%-32s %14s' % ('batch conversion', 'values/s'))
+    for name, values in bench_batch():
+        print('%-32s %14.0f' % (name, values))
+    print('')
+    print('%-32s %14s %14s' % ('startup', 'import ms', 'first conv ms'))
+    for name, (imported, converted) in bench_startup():
+        print('%-32s %14.1f %14.1f' % (name, imported * 1000,
+                                       converted * 1000))
+
+
+def main(args=None):
+    parser = optparse.OptionParser(description=__doc__.splitlines()[0])
+    parser.add_option(
+        '--baseline', help='Fail if slower than the results in this file.')
+    parser.add_option(
+        '--save-baseline', help='Store the results in this file.')
+    parser.add_option(
+        '--tolerance', type='float', default=0.8,
+        help='Allowed fraction of the baseline (default: 0.8).')
+    parser.add_option(
+        '--scale', type='float', default=1.0,
+        help='Scale the number of runs (default: 1.0).')
+    parser.add_option(
+        '--compare', action='store_true', default=False,
+        help='Also compare with pint, batch conversion and startup time.')
+    options, arguments = parser.parse_args(args)
+
+    results = run_suite(options.scale)
+    print_suite(results)
+    if options.compare:
+        print('')
+        print_comparisons()
+    if options.save_baseline:
+        save_baseline(results, options.save_baseline)
+    if options.baseline:
+        failures = check_baseline(
+            results, load_baseline(options.baseline), options.tolerance)
+        for name, ops, expected in failures:
+            print('FAILED: %s: %.0f ops/s, baseline %.0f ops/s' % (
+                name, ops, expected))
+        if failures:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
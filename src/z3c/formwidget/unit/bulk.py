@@ -0,0 +1,437 @@
+# -*- coding: utf-8 -*-
+"""Convert the unit values of CSV or JSON lines files.
+
+The ``unit-convert`` command streams the rows of a file and converts the
+values of the given columns to the base unit or to the best fitting unit of
+a unit system. The values are given in the unit of the column or include
+their units (``12 ft 3 in``, see ``parser``). Malformed rows are reported
+and skipped. Examples::
+
+    unit-convert plots.csv -o plots-base.csv -c area:area:acre
+    unit-convert plots.jsonl -c area:area -c width:length --best imperial
+"""
+
+# python imports
+from collections import deque
+import csv
+import io
+import json
+import optparse
+import sys
+import time
+from pint import DimensionalityError, UndefinedUnitError
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    # Python 2.6 doesn't keep the order of JSON objects.
+    OrderedDict = None
+
+# local imports
+from z3c.formwidget.unit import conversion, interfaces, parser, utils
+
+
+PY2 = sys.version_info[0] == 2
+
+try:
+    text_type = unicode
+except NameError:
+    text_type = str
+
+
+def to_text(value):
+    if isinstance(value, bytes):
+        return value.decode('utf-8')
+    return text_type(value)
+
+
+def format_number(value, digits=6):
+    """Format a magnitude without trailing zeros."""
+    text = '%.*f' % (digits, value)
+    if '.' in text:
+        text = text.rstrip('0').rstrip('.')
+    return text
+
+
+class Column(object):
+    """A column to convert: the name, dimension and unit of its values."""
+
+    def __init__(self, name, dimension, unit=None):
+        if dimension not in interfaces.BASE_UNITS:
+            raise ValueError('Unknown dimension: %s' % dimension)
+        if unit and unit not in interfaces.UNITS_BY_ID:
+            raise ValueError('Unknown unit: %s' % unit)
+        self.name = name
+        self.dimension = dimension
+        self.unit = unit
+        self.base_unit = interfaces.BASE_UNITS[dimension]
+        if unit and unit != self.base_unit:
+            # Units without a ladder (e.g. yd) are added to the table once.
+            try:
+                conversion.add_ratio(unit, self.base_unit)
+            except (DimensionalityError, UndefinedUnitError):
+                raise ValueError('Unit %s is not a unit of %s' % (
+                    unit, dimension))
+
+    @classmethod
+    def from_spec(cls, spec):
+        """Create a column from ``name:dimension[:unit]``."""
+        parts = spec.split(':')
+        if len(parts) not in (2, 3):
+            raise ValueError('Invalid column: %s' % spec)
+        return cls(*parts)
+
+
+class Converter(object):
+    """Convert the values of columns.
+
+    ``system`` selects the best fitting units of that unit system, otherwise
+    the values are converted to the base unit. Converters are sent to the
+    worker processes, so they only hold plain data.
+    """
+
+    def __init__(self, columns, system=None, digits=6):
+        self.columns = columns
+        self.system = system
+        self.digits = digits
+
+    def convert_value(self, value, column):
+        """Return the text of the converted magnitude and its unit.
+
+        Empty values stay empty. Raise ``ValueError`` for values which can't
+        be converted.
+        """
+        magnitude, unit = self.convert_magnitude(value, column)
+        if magnitude is None:
+            return u'', u''
+        return format_number(magnitude, self.digits), unit
+
+    def convert_magnitude(self, value, column):
+        """Return the converted magnitude (a float) and its unit.
+
+        Return ``(None, None)`` for empty values. Raise ``ValueError`` for
+        values which can't be converted.
+        """
+        text = to_text(value).strip()
+        if not text:
+            return None, None
+        quantity = parser.parse(text, column.dimension)
+        if quantity is not None:
+            magnitude = float(quantity[0])
+        else:
+            try:
+                magnitude = float(text)
+            except ValueError:
+                raise ValueError('Invalid value in column %s' % column.name)
+            if column.unit and column.unit != column.base_unit:
+                try:
+                    magnitude = conversion.convert(
+                        magnitude, column.unit, column.base_unit)
+                except KeyError:
+                    raise ValueError('Unknown unit: %s' % column.unit)
+        unit = column.base_unit
+        if self.system is not None:
+            unit = utils.get_best_unit(
+                magnitude, self.system, column.dimension)[0]
+            if unit is None:
+                raise ValueError('No units for %s, %s' % (
+                    self.system, column.dimension))
+            magnitude = conversion.convert(magnitude, column.base_unit, unit)
+        return magnitude, unit
+
+    def convert_record(self, record):
+        """Convert the columns of a mapping in place.
+
+        The converted magnitudes are numbers, rounded to ``digits``.
+        """
+        for column in self.columns:
+            if column.name not in record:
+                raise ValueError('Missing column: %s' % column.name)
+            value = record[column.name]
+            if value is None:
+                # Missing values stay missing, like empty values.
+                record[column.name + '_unit'] = None
+                continue
+            magnitude, unit = self.convert_magnitude(value, column)
+            if magnitude is None:
+                record[column.name], record[column.name + '_unit'] = u'', u''
+                continue
+            record[column.name] = round(magnitude, self.digits)
+            record[column.name + '_unit'] = unit
+        return record
+
+
+class MalformedRow(object):
+    """A row the CSV reader failed to read."""
+
+    def __init__(self, error):
+        self.error = error
+
+
+class CSVFormat(object):
+    """Read and write CSV rows."""
+
+    def __init__(self, converter):
+        self.converter = converter
+        self.header = None
+        self.indexes = None
+
+    def read(self, stream):
+        """Read the header and return an iterator of (line number, row)
+        tuples.
+        """
+        reader = csv.reader(stream)
+        try:
+            self.header = next(reader)
+        except StopIteration:
+            raise ValueError('No header')
+        try:
+            self.indexes = [
+                self.header.index(column.name)
+                for column in self.converter.columns
+            ]
+        except ValueError:
+            raise ValueError('Missing column in header: %s' % ', '.join([
+                column.name for column in self.converter.columns
+                if column.name not in self.header
+            ]))
+        return self._rows(reader)
+
+    def _rows(self, reader):
+        while True:
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as error:
+                # Report the malformed row, the reader goes on with the next.
+                row = MalformedRow(str(error))
+            yield reader.line_num, row
+
+    def start(self, stream):
+        writer = csv.writer(stream, lineterminator='\n')
+        writer.writerow(self.header + [
+            column.name + '_unit' for column in self.converter.columns
+        ])
+        return writer.writerow
+
+    def convert(self, row):
+        if isinstance(row, MalformedRow):
+            raise ValueError(row.error)
+        if len(row) != len(self.header):
+            raise ValueError('Expected %d values, got %d' % (
+                len(self.header), len(row)))
+        row = list(row)
+        units = []
+        for column, index in zip(self.converter.columns, self.indexes):
+            row[index], unit = self.converter.convert_value(row[index], column)
+            units.append(unit)
+        if PY2:
+            row = [to_text(value).encode('utf-8') for value in row]
+        return row + units
+
+
+class JSONLinesFormat(object):
+    """Read and write JSON objects, one per line."""
+
+    def __init__(self, converter):
+        self.converter = converter
+
+    def read(self, stream):
+        """Return an iterator of (line number, line) tuples."""
+        return (
+            (number, line) for number, line in enumerate(stream, 1)
+            if line.strip()
+        )
+
+    def start(self, stream):
+        def write(line):
+            stream.write(line + u'\n')
+        return write
+
+    def convert(self, line):
+        if OrderedDict is None:
+            record = json.loads(to_text(line))
+        else:
+            record = json.loads(
+                to_text(line), object_pairs_hook=OrderedDict)
+        if not isinstance(record, dict):
+            raise ValueError('Not an object')
+        return to_text(json.dumps(
+            self.converter.convert_record(record), ensure_ascii=False))
+
+
+FORMATS = {
+    'csv': CSVFormat,
+    'jsonl': JSONLinesFormat,
+}
+
+
+def convert_chunk(file_format, chunk):
+    """Convert a chunk of (line number, row) tuples.
+
+    Return a list of (line number, converted row, error) tuples.
+    """
+    results = []
+    for number, row in chunk:
+        try:
+            results.append((number, file_format.convert(row), None))
+        except (ValueError, TypeError) as error:
+            results.append((number, None, str(error)))
+    return results
+
+
+def _convert_chunk(args):
+    return convert_chunk(*args)
+
+
+def chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def convert_stream(file_format, rows, processes=0, chunk_size=1000):
+    """Yield the results of ``convert_chunk`` for all rows.
+
+    With ``processes``, the chunks are converted by a process pool. At most
+    two chunks per process are pending, so the memory stays constant.
+    """
+    if not processes:
+        for chunk in chunks(rows, chunk_size):
+            for result in convert_chunk(file_format, chunk):
+                yield result
+        return
+
+    import multiprocessing
+    pool = multiprocessing.Pool(processes)
+    try:
+        pending = deque()
+        for chunk in chunks(rows, chunk_size):
+            pending.append(pool.apply_async(
+                _convert_chunk, ((file_format, chunk),)))
+            if len(pending) >= processes * 2:
+                for result in pending.popleft().get():
+                    yield result
+        while pending:
+            for result in pending.popleft().get():
+                yield result
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def open_input(path):
+    if path == '-':
+        if PY2:
+            return sys.stdin
+        return io.TextIOWrapper(
+            sys.stdin.buffer, encoding='utf-8', newline='')
+    if PY2:
+        return open(path, 'rb')
+    return io.open(path, encoding='utf-8', newline='')
+
+
+def open_output(path, file_format):
+    if path == '-':
+        if PY2 and file_format == 'jsonl':
+            return io.open(sys.stdout.fileno(), 'w', encoding='utf-8',
+                           closefd=False)
+        return sys.stdout
+    if PY2 and file_format == 'csv':
+        return open(path, 'wb')
+    return io.open(path, 'w', encoding='utf-8', newline='')
+
+
+def detect_format(path):
+    if path.endswith('.csv'):
+        return 'csv'
+    return 'jsonl'
+
+
+def main(args=None):
+    arguments = optparse.OptionParser(
+        prog='unit-convert', usage='%prog [options] input',
+        description=__doc__.splitlines()[0] + ' The input is a CSV or '
+        'JSON lines file, "-" for stdin.')
+    arguments.add_option(
+        '-o', '--output', default='-', help='Output file (default: stdout).')
+    arguments.add_option(
+        '-f', '--format', type='choice', choices=sorted(FORMATS),
+        help='Input and output format (default: by file extension).')
+    arguments.add_option(
+        '-c', '--column', action='append', default=[],
+        help='Column to convert as name:dimension[:unit], e.g. '
+             'area:area:acre. Values without units are in the given unit '
+             'or the base unit.')
+    arguments.add_option(
+        '--best', metavar='SYSTEM', type='choice',
+        choices=sorted(interfaces.UNITS),
+        help='Convert to the best fitting units of a unit system instead '
+             'of the base units.')
+    arguments.add_option(
+        '--digits', type='int', default=6,
+        help='Decimal places of the magnitudes (default: 6).')
+    arguments.add_option(
+        '-j', '--processes', type='int', default=0,
+        help='Convert with a pool of worker processes.')
+    arguments.add_option(
+        '--chunk-size', type='int', default=1000,
+        help='Rows sent to a worker process at once (default: 1000).')
+    options, positional = arguments.parse_args(args)
+    if len(positional) != 1:
+        arguments.error('Expected one input file.')
+    if not options.column:
+        arguments.error('At least one column (-c) is required.')
+    options.input = positional[0]
+
+    try:
+        columns = [Column.from_spec(spec) for spec in options.column]
+    except (TypeError, ValueError) as error:
+        arguments.error(str(error))
+    converter = Converter(columns, options.best, options.digits)
+    name = options.format or detect_format(options.input)
+    file_format = FORMATS[name](converter)
+
+    start = time.time()
+    converted = invalid = 0
+    source = open_input(options.input)
+    try:
+        try:
+            rows = file_format.read(source)
+        except ValueError as error:
+            sys.stderr.write('%s\n' % error)
+            return 1
+        target = open_output(options.output, name)
+        try:
+            write = file_format.start(target)
+            results = convert_stream(
+                file_format, rows, options.processes, options.chunk_size)
+            for number, row, error in results:
+                if error is not None:
+                    invalid += 1
+                    sys.stderr.write('Line %d: %s\n' % (number, error))
+                    continue
+                write(row)
+                converted += 1
+        finally:
+            if target is not sys.stdout:
+                target.close()
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+    duration = max(time.time() - start, 1e-6)
+    sys.stderr.write(
+        'Converted %d rows (%d invalid) in %.2f s (%.0f rows/s).\n' % (
+            converted, invalid, duration, (converted + invalid) / duration))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""Process wide caches."""
+
+# python imports
+import threading
+
+
+# The fields of the links of the recently used list.
+PREV, NEXT, KEY, VALUE = 0, 1, 2, 3
+
+
+class LRUCache(object):
+    """A thread safe cache with a bounded size.
+
+    The least recently used entries are dropped when the cache is full. The
+    entries are kept in a circular doubly linked list, most recently used
+    last (``collections.OrderedDict`` needs Python 2.7).
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = {}
+        self._root = []
+        self._root[:] = [self._root, self._root, None, None]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def _unlink(self, link):
+        link[PREV][NEXT] = link[NEXT]
+        link[NEXT][PREV] = link[PREV]
+
+    def _append(self, link):
+        last = self._root[PREV]
+        link[PREV] = last
+        link[NEXT] = self._root
+        last[NEXT] = self._root[PREV] = link
+
+    def _shrink(self):
+        while len(self._data) > self.maxsize:
+            oldest = self._root[NEXT]
+            self._unlink(oldest)
+            del self._data[oldest[KEY]]
+
+    def get(self, key, default=None):
+        with self._lock:
+            link = self._data.get(key)
+            if link is None:
+                self.misses += 1
+                return default
+            self._unlink(link)
+            self._append(link)
+            self.hits += 1
+            return link[VALUE]
+
+    def set(self, key, value):
+        with self._lock:
+            link = self._data.get(key)
+            if link is not None:
+                self._unlink(link)
+                link[VALUE] = value
+            else:
+                link = [None, None, key, value]
+                self._data[key] = link
+            self._append(link)
+            self._shrink()
+
+    def resize(self, maxsize):
+        with self._lock:
+            self.maxsize = maxsize
+            self._shrink()
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._root[:] = [self._root, self._root, None, None]
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Return a dictionary with the cache statistics."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+        }
+
+
+_caches = {}
+
+
+def get_cache(name, maxsize=128):
+    """Return the cache registered as ``name``, create it if necessary."""
+    cache = _caches.get(name)
+    if cache is None:
+        cache = _caches.setdefault(name, LRUCache(maxsize))
+    return cache
+
+
+def clear(name=None):
+    """Clear the cache ``name`` or all caches.
+
+    Call this after translation domains were reloaded, so that no outdated
+    translations are used.
+    """
+    if name is not None:
+        caches = [_caches[name]] if name in _caches else []
+    else:
+        caches = _caches.values()
+    for cache in caches:
+        cache.clear()
+
+
+def stats():
+    """Return the statistics of all caches."""
+    return dict((name, cache.stats()) for name, cache in _caches.items())
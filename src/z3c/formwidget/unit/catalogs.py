@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""Compile the gettext catalogs of z3c.formwidget.unit.
+
+The ``.mo`` files are compiled when the package is built (see ``setup.py``),
+so no worker has to compile or parse ``.po`` files at startup. Run
+``python -m z3c.formwidget.unit.catalogs`` to compile the catalogs of a
+checkout, ``--check`` only reports outdated catalogs. Compiling needs
+python-gettext, checking doesn't.
+
+This module doesn't import the package, ``setup.py`` loads it by path.
+"""
+
+# python imports
+import optparse
+import os
+import sys
+
+
+LOCALES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'locales')
+
+
+def find_catalogs(directory=LOCALES):
+    """Return (language, domain, po path, mo path) tuples of a directory."""
+    catalogs = []
+    for language in sorted(os.listdir(directory)):
+        messages = os.path.join(directory, language, 'LC_MESSAGES')
+        if not os.path.isdir(messages):
+            continue
+        for filename in sorted(os.listdir(messages)):
+            domain, ext = os.path.splitext(filename)
+            if ext != '.po':
+                continue
+            catalogs.append((
+                language,
+                domain,
+                os.path.join(messages, filename),
+                os.path.join(messages, domain + '.mo'),
+            ))
+    return catalogs
+
+
+def is_outdated(po_path, mo_path):
+    """Return ``True`` if the ``.mo`` file is missing or older than the
+    ``.po`` file.
+
+    Only the modification times are compared. A ``.mo`` file which is newer
+    than its ``.po`` file is taken as up to date, even if it was compiled
+    from other content (e.g. after copying files without their times). Use
+    ``--force`` then.
+    """
+    if not os.path.exists(mo_path):
+        return True
+    return os.path.getmtime(mo_path) < os.path.getmtime(po_path)
+
+
+def outdated_catalogs(directory=LOCALES):
+    """Return the catalogs of a directory whose ``.mo`` file is outdated."""
+    return [
+        catalog for catalog in find_catalogs(directory)
+        if is_outdated(catalog[2], catalog[3])
+    ]
+
+
+def can_compile():
+    """Check if python-gettext is installed."""
+    try:
+        import pythongettext.msgfmt
+    except ImportError:
+        return False
+    return True
+
+
+def compile_catalog(po_path, mo_path):
+    """Compile a ``.po`` file with python-gettext."""
+    from pythongettext.msgfmt import Msgfmt
+    with open(po_path, 'rb') as po_file:
+        data = Msgfmt(po_file, name=po_path).get()
+    with open(mo_path, 'wb') as mo_file:
+        mo_file.write(data)
+
+
+def compile_catalogs(directory=LOCALES, force=False):
+    """Compile the outdated catalogs of a directory.
+
+    Return the catalogs which were compiled.
+    """
+    if force:
+        catalogs = find_catalogs(directory)
+    else:
+        catalogs = outdated_catalogs(directory)
+    for language, domain, po_path, mo_path in catalogs:
+        compile_catalog(po_path, mo_path)
+    return catalogs
+
+
+def main(args=None):
+    parser = optparse.OptionParser(
+        prog='python -m z3c.formwidget.unit.catalogs',
+        usage='%prog [options] [directory]',
+        description='Compile the gettext catalogs of z3c.formwidget.unit. '
+                    'The directory defaults to the package catalogs.')
+    parser.add_option(
+        '--check', action='store_true', default=False,
+        help='Only list outdated catalogs, fail if there are any.')
+    parser.add_option(
+        '--force', action='store_true', default=False,
+        help='Compile all catalogs, even if they are up to date.')
+    options, arguments = parser.parse_args(args)
+    if len(arguments) > 1:
+        parser.error('Only one directory can be given.')
+    directory = arguments and arguments[0] or LOCALES
+
+    if options.check:
+        catalogs = outdated_catalogs(directory)
+        for language, domain, po_path, mo_path in catalogs:
+            print('Outdated catalog: %s' % po_path)
+        return catalogs and 1 or 0
+    if not can_compile():
+        print('python-gettext is required to compile the catalogs.')
+        return 1
+    for language, domain, po_path, mo_path in compile_catalogs(
+            directory, options.force):
+        print('Compiled %s' % mo_path)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
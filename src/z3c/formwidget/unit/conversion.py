@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+"""Precomputed unit conversion table.
+
+The tables are built once and published as one immutable ``Table``, so
+conversions read them without locks. Building (and pint) is serialized by a
+lock, it only happens on first use and after ``reset``.
+"""
+
+# python imports
+from collections import namedtuple
+from decimal import Context, Decimal, InvalidOperation
+from fractions import Fraction
+import json
+import threading
+
+# local imports
+from z3c.formwidget.unit import DEFINITIONS, cache, interfaces, snapshot
+
+
+# Number of significant digits kept for factors resolved with pint.
+PRECISION = 15
+
+try:
+    NUMBER_TYPES = (int, long, float)
+except NameError:
+    NUMBER_TYPES = (int, float)
+
+
+class Table(namedtuple('Table', 'factors ratios json')):
+    """The factors, ratios and JSON factor tables of all units.
+
+    The mappings are never changed once a table is published. Changes build
+    a new table.
+    """
+    __slots__ = ()
+
+
+_table = None
+_build_lock = threading.Lock()
+
+# Ratios of unit pairs which are no known units, e.g. units of requests. They
+# are bounded, unlike the table.
+EXTRA_RATIOS = cache.get_cache('ratios', maxsize=256)
+
+
+def parse_definitions(path=DEFINITIONS):
+    """Parse a pint definition file.
+
+    Return a mapping of unit names (including aliases) to a tuple of the
+    exact factor and the reference expression, e.g. for
+    ``hectare = 10000 * m**2 = ha`` the entry for ``ha`` is
+    ``(Decimal('10000'), 'm**2')``.
+    """
+    definitions = {}
+    with open(path) as definition_file:
+        for line in definition_file:
+            line = line.split('#', 1)[0].strip()
+            if not line or line.startswith('@') or '=' not in line:
+                continue
+            parts = [part.strip() for part in line.split('=')]
+            factor, _, reference = parts[1].partition('*')
+            try:
+                factor = Decimal(factor.strip())
+            except InvalidOperation:
+                continue
+            for name in [parts[0]] + parts[2:]:
+                definitions[name] = (factor, reference.strip())
+    return definitions
+
+
+def _resolve_with_pint(unit, base_unit):
+    """Resolve the factor of a unit pint knows by default (e.g. ``ft``)."""
+    from z3c.formwidget.unit import ureg
+    quantity = 1 * getattr(ureg, unit)
+    magnitude = quantity.to(getattr(ureg, base_unit)).magnitude
+    # Get rid of binary floating point noise like 0.30479999999999996.
+    factor = Context(prec=PRECISION).create_decimal(repr(float(magnitude)))
+    return Fraction.from_decimal(factor)
+
+
+def _factor(unit, base_unit, definitions):
+    if unit == base_unit:
+        return Fraction(1)
+    unit_definition = definitions.get(unit)
+    base_definition = definitions.get(base_unit)
+    if unit_definition and base_definition and \
+            unit_definition[1] == base_definition[1]:
+        return Fraction.from_decimal(unit_definition[0]) / \
+            Fraction.from_decimal(base_definition[0])
+    return _resolve_with_pint(unit, base_unit)
+
+
+def get_unit_ids():
+    """Return the ids of all units which are part of the table."""
+    unit_ids = set(interfaces.BASE_UNITS.values())
+    for dimensions in interfaces.UNITS.values():
+        for units in dimensions.values():
+            unit_ids.update([unit[0] for unit in units])
+    return unit_ids
+
+
+def build_factors(definitions=None):
+    """Compute the factors of all units in ``interfaces.UNITS``.
+
+    Return a mapping of unit ids to ``(dimension, factor)`` tuples where
+    ``factor`` is an exact :class:`fractions.Fraction` relative to the base
+    unit of the dimension.
+    """
+    if definitions is None:
+        definitions = parse_definitions()
+    factors = {}
+    for dimension, base_unit in interfaces.BASE_UNITS.items():
+        factors[base_unit] = (dimension, Fraction(1))
+    for dimensions in interfaces.UNITS.values():
+        for dimension, units in dimensions.items():
+            base_unit = interfaces.BASE_UNITS.get(dimension)
+            if base_unit is None:
+                continue
+            for unit in units:
+                if unit[0] in factors:
+                    continue
+                factors[unit[0]] = (
+                    dimension,
+                    _factor(unit[0], base_unit, definitions),
+                )
+    return factors
+
+
+def build_ratios(factors):
+    """Compute the conversion ratios for every pair of units.
+
+    Return a mapping of ``(from_unit, to_unit)`` tuples to
+    ``(numerator, denominator, ratio)`` tuples. ``numerator`` and
+    ``denominator`` are used for exact :class:`decimal.Decimal` conversions,
+    ``ratio`` is the float used for all other numbers.
+    """
+    ratios = {}
+    for from_unit, (from_dimension, from_factor) in factors.items():
+        for to_unit, (to_dimension, to_factor) in factors.items():
+            if from_dimension != to_dimension:
+                continue
+            ratio = from_factor / to_factor
+            ratios[(from_unit, to_unit)] = (
+                ratio.numerator,
+                ratio.denominator,
+                float(ratio),
+            )
+    return ratios
+
+
+def build_json(factors):
+    """Return a mapping of dimensions to their factors as compact JSON."""
+    dimensions = {}
+    for unit, (dimension, factor) in factors.items():
+        dimensions.setdefault(dimension, {})[unit] = float(factor)
+    return dict(
+        (dimension, json.dumps(
+            unit_factors, sort_keys=True, separators=(',', ':')))
+        for dimension, unit_factors in dimensions.items()
+    )
+
+
+def get_table():
+    """Return the current table, build it if needed.
+
+    The factors are loaded from the snapshot if there is an up to date one.
+    """
+    table = _table
+    if table is None:
+        with _build_lock:
+            table = _current_table()
+    return table
+
+
+def _current_table():
+    """Return the table, build it if there is none.
+
+    The caller must hold the build lock.
+    """
+    global _table
+    if _table is None:
+        factors = snapshot.load(units=get_unit_ids())
+        if factors is None:
+            factors = build_factors()
+        _table = Table(factors, build_ratios(factors), build_json(factors))
+    return _table
+
+
+def get_factors():
+    """Return the factor table."""
+    return get_table().factors
+
+
+def get_ratios():
+    """Return the ratio table."""
+    return get_table().ratios
+
+
+def add_ratio(from_unit, to_unit):
+    """Add the ratio of a unit pair which is not part of the table.
+
+    The ratio is resolved with pint once, so later conversions of the pair
+    don't use pint. pint's errors (e.g. ``UndefinedUnitError``) are raised
+    for unknown or incompatible units.
+    """
+    global _table
+    with _build_lock:
+        table = _current_table()
+        if (from_unit, to_unit) in table.ratios:
+            return
+        ratio = _resolve_with_pint(from_unit, to_unit)
+        ratios = dict(table.ratios)
+        ratios[(from_unit, to_unit)] = (
+            ratio.numerator,
+            ratio.denominator,
+            float(ratio),
+        )
+        _table = table._replace(ratios=ratios)
+
+
+def reset():
+    """Drop the tables, they are rebuilt on the next conversion."""
+    global _table
+    _table = None
+
+
+def get_factor_table(dimension):
+    """Return the factors of the units of a dimension as compact JSON.
+
+    The factors are floats relative to the base unit of the dimension, e.g.
+    ``{"ha":10000.0,"sq_km":1000000.0,"sq_m":1.0}``. They are meant for
+    converting values in the browser.
+    """
+    return get_table().json.get(dimension, '{}')
+
+
+def has_unit(unit):
+    """Check if ``unit`` is part of the conversion table."""
+    return unit in get_factors()
+
+
+def convert(value, from_unit, to_unit):
+    """Convert ``value`` from ``from_unit`` to ``to_unit``.
+
+    :class:`decimal.Decimal` values keep their precision, all other numbers
+    are converted using floats. Raise a ``KeyError`` if the unit pair is not
+    part of the table and a ``TypeError`` if ``value`` is not a number.
+    """
+    numerator, denominator, ratio = get_ratios()[(from_unit, to_unit)]
+    if isinstance(value, Decimal):
+        return value * numerator / denominator
+    if isinstance(value, NUMBER_TYPES):
+        return value * ratio
+    raise TypeError('Can not convert value of type %s.' % type(value))
+
+
+def convert_any(value, from_unit, to_unit):
+    """Convert ``value`` between any units pint knows.
+
+    The ratios of known units (``interfaces.UNITS_BY_ID``) are added to the
+    table (see ``add_ratio``), the ratios of other units to
+    ``EXTRA_RATIOS``. pint's errors (e.g. ``UndefinedUnitError``) are raised
+    for unknown or incompatible units.
+    """
+    try:
+        return convert(value, from_unit, to_unit)
+    except KeyError:
+        pass
+    if from_unit in interfaces.UNITS_BY_ID and \
+            to_unit in interfaces.UNITS_BY_ID:
+        add_ratio(from_unit, to_unit)
+        return convert(value, from_unit, to_unit)
+    key = (from_unit, to_unit)
+    ratio = EXTRA_RATIOS.get(key)
+    if ratio is None:
+        ratio = _resolve_with_pint(from_unit, to_unit)
+        EXTRA_RATIOS.set(key, ratio)
+    if isinstance(value, Decimal):
+        return value * ratio.numerator / ratio.denominator
+    if isinstance(value, NUMBER_TYPES):
+        return value * float(ratio)
+    raise TypeError('Can not convert value of type %s.' % type(value))
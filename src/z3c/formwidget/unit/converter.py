@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""Data converters for unit widgets."""
+
+# python imports
+from decimal import Decimal
+
+# zope imports
+from z3c.form.converter import BaseDataConverter, DecimalDataConverter
+from z3c.form.converter import FloatDataConverter, NumberDataConverter
+from zope.component import adapts
+from zope.interface import implementsOnly
+from zope.schema.interfaces import IDecimal, IFloat
+
+# local imports
+from z3c.formwidget.unit import cache, interfaces
+from z3c.formwidget.unit.i18n import _
+
+
+FORMATTERS = cache.get_cache('formatters', maxsize=64)
+
+
+def get_formatter(locale, type):
+    """Return the shared decimal number formatter of a locale.
+
+    Setting up a formatter parses the number pattern of the locale, so the
+    formatters are created once per locale and number type. They are not
+    changed afterwards and can be used by all threads.
+    """
+    locale_id = locale.id
+    key = (locale_id.language, locale_id.territory, locale_id.variant, type)
+    formatter = FORMATTERS.get(key)
+    if formatter is None:
+        formatter = locale.numbers.getFormatter('decimal')
+        formatter.type = type
+        FORMATTERS.set(key, formatter)
+    return formatter
+
+
+class UnitNumberDataConverter(NumberDataConverter):
+    """Number data converter for unit widgets using the shared formatters."""
+    implementsOnly(interfaces.IUnitDataConverter)
+
+    def __init__(self, field, widget):
+        BaseDataConverter.__init__(self, field, widget)
+        self.formatter = get_formatter(widget.request.locale, self.type)
+
+    def format(self, value):
+        if value is self.field.missing_value:
+            return u''
+        return self.formatter.format(value)
+
+
+class UnitDecimalDataConverter(UnitNumberDataConverter):
+    """Data converter for decimal fields and unit widgets."""
+    adapts(IDecimal, interfaces.IUnitWidget)
+
+    type = Decimal
+    errorMessage = DecimalDataConverter.errorMessage
+
+
+class UnitFloatDataConverter(UnitNumberDataConverter):
+    """Data converter for float fields and unit widgets."""
+    adapts(IFloat, interfaces.IUnitWidget)
+
+    type = float
+    errorMessage = FloatDataConverter.errorMessage
+
+
+class QuantityDataConverter(UnitNumberDataConverter):
+    """Data converter for quantity fields and unit widgets.
+
+    Every number is remembered by the widget together with its text (see
+    ``interfaces.IUnitWidget.remember_number``). A text which was rendered or
+    extracted by the widget is not parsed again, so the field gets the number
+    with its full precision.
+    """
+    adapts(interfaces.IQuantity, interfaces.IUnitWidget)
+
+    errorMessage = _(u'The entered value is not a valid quantity.')
+
+    def __init__(self, field, widget):
+        self.type = field.decimal and Decimal or float
+        super(QuantityDataConverter, self).__init__(field, widget)
+
+    def toWidgetValue(self, value):
+        text = self.format(value)
+        self.widget.remember_number(text, value)
+        return text
+
+    def toFieldValue(self, value):
+        number = self.widget.remembered_number(value)
+        if number is None:
+            number = super(QuantityDataConverter, self).toFieldValue(value)
+            self.widget.remember_number(value, number)
+        return number
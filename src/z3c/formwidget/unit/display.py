@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""Fast renderer for unit widgets in display mode.
+
+Listings with many display widgets spend most of the time in the page
+template machinery. ``render_display`` produces the same markup as
+``templates/display.pt`` without a page template. Enable it for all widgets
+with ``ENABLED`` or for single widgets with their ``fast_display``
+attribute. Don't enable it if you registered a custom display template.
+"""
+
+# zope imports
+from zope.i18n import translate
+from zope.i18nmessageid import Message
+
+try:
+    text_type = unicode
+except NameError:
+    text_type = str
+
+
+# Use the fast renderer for all widgets which don't decide themselves.
+ENABLED = False
+
+# The template keeps the order of the attributes in the markup (id, class)
+# and appends the other attributes sorted by name.
+ATTRIBUTES = [
+    ('id', 'id'),
+    ('class', 'klass'),
+] + sorted([(name, name) for name in (
+    'style',
+    'title',
+    'lang',
+    'onclick',
+    'ondblclick',
+    'onmousedown',
+    'onmouseup',
+    'onmouseover',
+    'onmousemove',
+    'onmouseout',
+    'onkeypress',
+    'onkeydown',
+    'onkeyup',
+)])
+
+MARKUP = u'\n    <span%s>%s</span> <span>%s</span>\n\n'
+
+
+def escape(value):
+    """Escape a text like the page template does."""
+    return text_type(value).replace(u'&', u'&amp;').replace(
+        u'<', u'&lt;').replace(u'>', u'&gt;')
+
+
+def escape_attribute(value):
+    """Escape an attribute value like the page template does."""
+    return escape(value).replace(u'"', u'&quot;')
+
+
+def translated(widget, value):
+    """Translate a message against the request of a widget, like the page
+    template does for attributes and contents."""
+    if isinstance(value, Message):
+        return translate(value, context=widget.request)
+    return value
+
+
+def use_fast_display(widget):
+    """Check if the fast renderer should be used for a widget."""
+    fast_display = getattr(widget, 'fast_display', None)
+    if fast_display is None:
+        return ENABLED
+    return fast_display
+
+
+def render_display(widget):
+    """Render a unit widget in display mode."""
+    attributes = []
+    for name, attribute in ATTRIBUTES:
+        value = getattr(widget, attribute, None)
+        if value is not None:
+            attributes.append(u' %s="%s"' % (
+                name, escape_attribute(translated(widget, value))))
+
+    content = u''
+    if widget.value:
+        value = widget.widget_value
+        if value is not None:
+            content = escape(translated(widget, value))
+
+    # The label depends on the unit selected by ``widget_value``.
+    label = widget.unit_label()
+    if label is None:
+        label = u''
+    return MARKUP % (
+        u''.join(attributes), content, escape(translated(widget, label)))
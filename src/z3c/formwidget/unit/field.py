@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""Schema fields for quantities."""
+
+# python imports
+from decimal import Decimal, InvalidOperation
+
+# zope imports
+from zope.interface import implements
+from zope.schema import Field, Orderable
+
+# local imports
+from z3c.formwidget.unit import interfaces
+
+
+class Quantity(Orderable, Field):
+    """A quantity stored as a number in the base unit of its dimension.
+
+    The value is a ``Decimal`` or, if ``decimal`` is false, a ``float``, so
+    it can be compared, sorted and indexed without parsing any text.
+    """
+    implements(interfaces.IQuantity)
+
+    def __init__(self, dimension=interfaces.DIMENSION_AREA, decimal=True,
+                 **kw):
+        self.dimension = dimension
+        self.decimal = decimal
+        self._type = decimal and Decimal or float
+        super(Quantity, self).__init__(**kw)
+
+    def fromUnicode(self, value):
+        try:
+            value = self._type(value)
+        except (InvalidOperation, ValueError):
+            raise ValueError('Invalid quantity: %r' % value)
+        self.validate(value)
+        return value
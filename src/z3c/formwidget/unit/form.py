@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""Form support for unit widgets."""
+
+# zope imports
+from zope.interface import implements
+from zope.security.proxy import Proxy, removeSecurityProxy
+
+# local imports
+from z3c.formwidget.unit import interfaces
+from z3c.formwidget.unit.widget import get_unit_systems
+
+
+class UnitFormMixin(object):
+    """Mixin for z3c.form edit forms with unit widgets.
+
+    The unit systems selected in the unit widgets are only stored when the
+    changes are applied, not when the form is only validated. The stored
+    unit systems are read once for all widgets of a context.
+    """
+    implements(interfaces.IUnitForm)
+
+    def update(self):
+        super(UnitFormMixin, self).update()
+        prefetch_unit_systems(self)
+
+    def applyChanges(self, data):
+        changes = super(UnitFormMixin, self).applyChanges(data)
+        for widget in unit_widgets(self):
+            widget.store_unit_system()
+        return changes
+
+
+def unit_widgets(form):
+    """Return the unit widgets of a form and its groups."""
+    forms = [form] + list(getattr(form, 'groups', ()))
+    for form in forms:
+        widgets = getattr(form, 'widgets', None)
+        if widgets is None:
+            continue
+        for widget in widgets.values():
+            if interfaces.IUnitWidget.providedBy(widget):
+                yield widget
+
+
+def prefetch_unit_systems(form):
+    """Hand the stored unit systems to all unit widgets of a form.
+
+    The annotations of every context are only read once. Widgets without a
+    prefetched map read the annotations themselves.
+    """
+    storages = {}
+    for widget in unit_widgets(form):
+        if widget.ignoreContext:
+            continue
+        context = widget.context
+        if isinstance(context, Proxy):
+            context = removeSecurityProxy(context)
+        key = id(context)
+        if key not in storages:
+            storage = get_unit_systems(context)
+            if storage is not None:
+                # A copy, so widgets never write to an outdated storage.
+                storage = dict(storage)
+            storages[key] = storage
+        widget.prefetched_unit_systems = storages[key]
@@ -1,8 +1,97 @@
 # -*- coding: utf-8 -*-
 """I18N utilities for z3c.formwidget.unit."""
 
+# python imports
+import threading
+
 # zope imports
+from zope.component import queryUtility
+from zope.i18n.gettextmessagecatalog import GettextMessageCatalog
+from zope.i18n.interfaces import IGlobalMessageCatalog, INegotiator
+from zope.i18n.interfaces import ITranslationDomain
 from zope.i18nmessageid import MessageFactory
+from zope.interface import implements
+
+
+DOMAIN = 'z3c.formwidget.unit'
+
+_ = MessageFactory(DOMAIN)
+
+
+def domain_languages(translation_domain):
+    """Return the languages with catalogs of a translation domain.
+
+    Return ``None`` if the domain doesn't tell its catalogs.
+    """
+    get_catalogs_info = getattr(translation_domain, 'getCatalogsInfo', None)
+    if get_catalogs_info is None:
+        return None
+    return list(get_catalogs_info())
+
+
+def negotiate_language(request, domain=DOMAIN):
+    """Return the language the translation domain would use for a request.
+
+    Domains which don't tell their catalogs use the language of the request
+    locale. Return ``None`` if there is no translation domain or negotiator.
+    """
+    translation_domain = queryUtility(ITranslationDomain, domain)
+    negotiator = queryUtility(INegotiator)
+    if translation_domain is None or negotiator is None:
+        return None
+    languages = domain_languages(translation_domain)
+    if languages is None:
+        locale = getattr(request, 'locale', None)
+        return locale is not None and locale.id.language or None
+    return negotiator.getLanguage(languages, request)
+
+
+class LazyGettextMessageCatalog(object):
+    """A gettext message catalog which reads its ``.mo`` file on the first
+    lookup.
+
+    Only the languages which are actually negotiated are loaded. The lookups
+    are delegated to a ``GettextMessageCatalog``.
+    """
+    implements(IGlobalMessageCatalog)
+
+    def __init__(self, language, domain, path_to_file):
+        self.language = language
+        self.domain = domain
+        self.path = path_to_file
+        self._messages = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._messages is not None
+
+    def load(self):
+        """Return the gettext catalog, read the ``.mo`` file if needed."""
+        messages = self._messages
+        if messages is None:
+            with self._lock:
+                messages = self._messages
+                if messages is None:
+                    messages = self._messages = GettextMessageCatalog(
+                        self.language, self.domain, self.path)
+        return messages
+
+    def reload(self):
+        """Read the ``.mo`` file again on the next lookup."""
+        self._messages = None
+
+    def getMessage(self, msgid):
+        return self.load().getMessage(msgid)
+
+    def queryMessage(self, msgid, default=None):
+        return self.load().queryMessage(msgid, default)
+
+    def getPluralMessage(self, singular, plural, n):
+        return self.load().getPluralMessage(singular, plural, n)
 
+    def queryPluralMessage(self, singular, plural, n, dft1=None, dft2=None):
+        return self.load().queryPluralMessage(singular, plural, n, dft1, dft2)
 
-_ = MessageFactory('z3c.formwidget.unit')
+    def getIdentifier(self):
+        return self.path
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""Catalog indexes for the values of unit widgets.
+
+The values of unit widgets are stored in the base unit of their dimension,
+as text, ``Decimal`` or ``float``. ``UnitIndex`` stores them as float
+magnitudes in a sorted structure and answers range queries given in any
+unit of the dimension. It requires ``zope.catalog`` (``catalog`` extra).
+"""
+
+# zope imports
+from zope.catalog.attribute import AttributeIndex
+from zope.catalog.interfaces import IAttributeIndex, ICatalogIndex
+from zope.container.contained import Contained
+from zope.interface import implementer
+import zope.index.field
+
+# local imports
+from z3c.formwidget.unit import conversion, interfaces
+
+
+try:
+    string_types = basestring
+except NameError:
+    string_types = str
+
+
+def magnitude(value):
+    """Return the float magnitude of a stored value.
+
+    Return ``None`` for missing values and texts which are not numbers.
+    """
+    if value is None:
+        return None
+    if isinstance(value, string_types):
+        value = value.strip()
+        if not value:
+            return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class UnitFieldIndex(zope.index.field.FieldIndex):
+    """Field index of magnitudes in the base unit of a dimension.
+
+    ``unit`` is the unit of the indexed values, the base unit of the
+    dimension by default. Queries are ``(min, max)`` tuples in the base unit
+    or ``(min, max, unit)`` tuples. ``None`` leaves a bound open.
+    """
+
+    def __init__(self, dimension=interfaces.DIMENSION_AREA, unit=None,
+                 family=None):
+        self.dimension = dimension
+        self.unit = unit
+        super(UnitFieldIndex, self).__init__(family)
+
+    @property
+    def base_unit(self):
+        return interfaces.BASE_UNITS[self.dimension]
+
+    def normalize(self, value, unit=None):
+        """Return the magnitude of ``value`` in the base unit."""
+        value = magnitude(value)
+        unit = unit or self.unit
+        if value is None or unit is None or unit == self.base_unit:
+            return value
+        try:
+            return conversion.convert(value, unit, self.base_unit)
+        except KeyError:
+            raise ValueError('Unknown unit for dimension %s: %s' % (
+                self.dimension, unit))
+
+    def index_doc(self, docid, value):
+        value = self.normalize(value)
+        if value is None:
+            self.unindex_doc(docid)
+            return
+        super(UnitFieldIndex, self).index_doc(docid, value)
+
+    def apply(self, query):
+        if not isinstance(query, tuple) or len(query) not in (2, 3):
+            raise TypeError('two- or three-length tuple expected', query)
+        unit = len(query) == 3 and query[2] or self.base_unit
+        # Convert the bounds once instead of every indexed value.
+        bounds = []
+        for bound in query[:2]:
+            if bound is not None:
+                bound = self.normalize(bound, unit)
+            bounds.append(bound)
+        return super(UnitFieldIndex, self).apply(tuple(bounds))
+
+
+class IUnitIndex(IAttributeIndex, ICatalogIndex):
+    """Catalog index of the values of unit widgets."""
+
+
+@implementer(IUnitIndex)
+class UnitIndex(AttributeIndex, UnitFieldIndex, Contained):
+    """Catalog index of the values of unit widgets.
+
+    The values are read like in other attribute indexes, e.g.
+    ``UnitIndex('area', IPlot, dimension='area')``.
+    """
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""Optional instrumentation of the unit widgets.
+
+``enable`` replaces the methods listed in ``HOOKS`` with timed wrappers,
+``disable`` restores them. The methods are replaced in ``MultiUnitWidget``
+and in all its subclasses which override them (e.g. custom widgets), as
+far as the subclasses exist when ``enable`` is called. Nothing is measured
+and there is no overhead while the instrumentation is disabled.
+
+Every call is counted and timed. Timings include nested calls, e.g. the
+time of ``render`` includes ``widget_value``. Overrides calling the method
+they override are measured once. The collected numbers are
+available from ``stats``, together with the hit rates of the caches. Sinks
+get every measurement, e.g. ``LoggingSink`` or ``StatsdSink``::
+
+    from z3c.formwidget.unit import instrumentation
+    instrumentation.enable(instrumentation.StatsdSink(statsd_client))
+"""
+
+# python imports
+import functools
+import logging
+import threading
+import timeit
+
+# local imports
+from z3c.formwidget.unit import cache
+
+
+# The instrumented methods and properties of the widgets.
+HOOKS = [
+    'widget_value',
+    'extract',
+    'items',
+    'render',
+    '_convert',
+    '_options',
+    '_get_unit_annotation',
+    '_set_unit_annotation',
+]
+
+logger = logging.getLogger('z3c.formwidget.unit')
+
+_lock = threading.Lock()
+# Maps (class, name) to the original method or property.
+_originals = {}
+# The names of the hooks each thread is measuring.
+_active = threading.local()
+_sinks = []
+_timings = {}
+
+
+def _widget_classes():
+    """Return ``MultiUnitWidget`` and all its subclasses."""
+    from z3c.formwidget.unit.widget import MultiUnitWidget
+    classes = [MultiUnitWidget]
+    for klass in classes:
+        for subclass in klass.__subclasses__():
+            if subclass not in classes:
+                classes.append(subclass)
+    return classes
+
+
+def _timed(name, func):
+    @functools.wraps(func)
+    def wrapper(*args, **kw):
+        active = getattr(_active, 'names', None)
+        if active is None:
+            active = _active.names = set()
+        if name in active:
+            # An override calling the method it overrides.
+            return func(*args, **kw)
+        active.add(name)
+        start = timeit.default_timer()
+        try:
+            return func(*args, **kw)
+        finally:
+            duration = timeit.default_timer() - start
+            active.discard(name)
+            record(name, duration)
+    return wrapper
+
+
+def enable(*sinks):
+    """Instrument the widgets and add sinks for the measurements."""
+    with _lock:
+        _sinks.extend(sinks)
+        if _originals:
+            return
+        for widget_class in _widget_classes():
+            for name in HOOKS:
+                original = widget_class.__dict__.get(name)
+                if original is None:
+                    continue
+                if isinstance(original, property):
+                    wrapped = property(
+                        _timed(name, original.fget), original.fset,
+                        original.fdel, original.__doc__)
+                else:
+                    wrapped = _timed(name, original)
+                _originals[(widget_class, name)] = original
+                setattr(widget_class, name, wrapped)
+
+
+def disable():
+    """Restore the widgets and remove all sinks.
+
+    The collected numbers are kept until ``reset`` is called.
+    """
+    with _lock:
+        for (widget_class, name), original in _originals.items():
+            setattr(widget_class, name, original)
+        _originals.clear()
+        del _sinks[:]
+
+
+def is_enabled():
+    return bool(_originals)
+
+
+def record(name, duration):
+    """Record the duration (in seconds) of a call."""
+    with _lock:
+        timing = _timings.get(name)
+        if timing is None:
+            timing = _timings[name] = [0, 0.0, 0.0]
+        timing[0] += 1
+        timing[1] += duration
+        timing[2] = max(timing[2], duration)
+        sinks = list(_sinks)
+    for sink in sinks:
+        sink(name, duration)
+
+
+def reset():
+    """Drop the collected numbers."""
+    with _lock:
+        _timings.clear()
+
+
+def stats():
+    """Return the collected numbers.
+
+    ``timings`` maps the hooks to their count and the total, mean and
+    maximum durations in seconds, ``caches`` maps the caches to their
+    statistics including the hit rate.
+    """
+    with _lock:
+        timings = dict(
+            (name, {
+                'count': count,
+                'total': total,
+                'mean': total / count,
+                'max': maximum,
+            })
+            for name, (count, total, maximum) in _timings.items()
+        )
+    caches = cache.stats()
+    for cache_stats in caches.values():
+        lookups = cache_stats['hits'] + cache_stats['misses']
+        cache_stats['hit_rate'] = lookups and \
+            float(cache_stats['hits']) / lookups or 0.0
+    return {'timings': timings, 'caches': caches}
+
+
+def log_stats(log=logger, level=logging.INFO):
+    """Write a summary of the collected numbers to a logger."""
+    collected = stats()
+    for name, timing in sorted(collected['timings'].items()):
+        log.log(
+            level, '%s: %d calls, %.3f ms total, %.3f ms mean, %.3f ms max',
+            name, timing['count'], timing['total'] * 1000,
+            timing['mean'] * 1000, timing['max'] * 1000)
+    for name, cache_stats in sorted(collected['caches'].items()):
+        log.log(
+            level, 'cache %s: %d hits, %d misses, %.1f%% hit rate',
+            name, cache_stats['hits'], cache_stats['misses'],
+            cache_stats['hit_rate'] * 100)
+
+
+class LoggingSink(object):
+    """Log every measurement."""
+
+    def __init__(self, log=logger, level=logging.DEBUG):
+        self.log = log
+        self.level = level
+
+    def __call__(self, name, duration):
+        self.log.log(self.level, '%s took %.3f ms', name, duration * 1000)
+
+
+class StatsdSink(object):
+    """Send every measurement to a statsd client.
+
+    The client needs a ``timing(name, milliseconds)`` method, like the one
+    of the ``statsd`` package.
+    """
+
+    def __init__(self, client, prefix='z3c.formwidget.unit'):
+        self.client = client
+        self.prefix = prefix
+
+    def __call__(self, name, duration):
+        self.client.timing(
+            '%s.%s' % (self.prefix, name.lstrip('_')), duration * 1000)
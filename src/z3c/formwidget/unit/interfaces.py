@@ -1,10 +1,20 @@
 # -*- coding: utf-8 -*-
 
 # python imports
+from collections import namedtuple
 from decimal import Decimal
 
+try:
+    from sys import intern
+except ImportError:
+    # Python 2 has a builtin.
+    pass
+
 # zope imports
-from z3c.form.interfaces import ITextWidget
+from z3c.form.interfaces import IDataConverter, ITextWidget
+from zope.interface import Attribute, Interface
+from zope.schema import ASCIILine, Bool
+from zope.schema.interfaces import IField, IFromUnicode, IMinMax
 
 # local imports
 from z3c.formwidget.unit.i18n import _
@@ -20,26 +30,40 @@ DIMENSION_LENGTH = 'length'
 
 UNIT_NONE = (None, None, None, None)
 
+
+class Unit(namedtuple('Unit', 'id label_short label info')):
+    """A unit.
+
+    Units are tuples of the unit id, the short label, the label and some
+    additional information, so they can be unpacked like plain tuples.
+    """
+    __slots__ = ()
+
+    def __new__(cls, id, label_short, label, info):
+        return super(Unit, cls).__new__(
+            cls, intern(str(id)), label_short, label, info)
+
+
 # Metric length units.
-UNIT_MM = ('mm', u'mm', _(u'millimeter'), _(u'0.001 meter'))
-UNIT_M = ('m', u'm', _(u'meter'), None)
-UNIT_KM = ('km', u'km', _(u'kilometer'), _(u'1,000 meter'))
+UNIT_MM = Unit('mm', u'mm', _(u'millimeter'), _(u'0.001 meter'))
+UNIT_M = Unit('m', u'm', _(u'meter'), None)
+UNIT_KM = Unit('km', u'km', _(u'kilometer'), _(u'1,000 meter'))
 
 # Metric area units.
-UNIT_SQM = ('sq_m', u'm²', _(u'square meter'), None)
-UNIT_HA = ('ha', u'ha', _(u'hectare'), _(u'10,000 square meter'))
-UNIT_SQKM = ('sq_km', u'km²', _(u'square kilometer'), _(u'100 hectare'))
+UNIT_SQM = Unit('sq_m', u'm²', _(u'square meter'), None)
+UNIT_HA = Unit('ha', u'ha', _(u'hectare'), _(u'10,000 square meter'))
+UNIT_SQKM = Unit('sq_km', u'km²', _(u'square kilometer'), _(u'100 hectare'))
 
 # Imperial length units.
-UNIT_IN = ('in', u'in', _(u'inch'), _(u'1/12 foot'))
-UNIT_FT = ('ft', u'ft', _(u'foot'), None)
-UNIT_YD = ('yd', u'yd', _(u'yard'), _(u'3 feet'))
-UNIT_MI = ('mi', u'mi', _(u'mile'), _(u'1,760 yards'))
+UNIT_IN = Unit('in', u'in', _(u'inch'), _(u'1/12 foot'))
+UNIT_FT = Unit('ft', u'ft', _(u'foot'), None)
+UNIT_YD = Unit('yd', u'yd', _(u'yard'), _(u'3 feet'))
+UNIT_MI = Unit('mi', u'mi', _(u'mile'), _(u'1,760 yards'))
 
 # Imperial area units.
-UNIT_SQFT = ('sq_ft', u'sq ft', _(u'square feet'), None)
-UNIT_ACRE = ('acre', u'acre', _(u'acre'), _(u'43,560 square feet'))
-UNIT_SQMI = ('sq_mi', u'sq mi', _(u'square mile'), _(u'640 acres'))
+UNIT_SQFT = Unit('sq_ft', u'sq ft', _(u'square feet'), None)
+UNIT_ACRE = Unit('acre', u'acre', _(u'acre'), _(u'43,560 square feet'))
+UNIT_SQMI = Unit('sq_mi', u'sq mi', _(u'square mile'), _(u'640 acres'))
 
 LABELS = {
     SYSTEM_METRIC: _(u'Metric'),
@@ -89,6 +113,11 @@ UNITS = {
     },
 }
 
+BASE_UNITS = {
+    DIMENSION_AREA: UNIT_SQM[0],
+    DIMENSION_LENGTH: UNIT_M[0],
+}
+
 METRICS = [
     UNIT_MM[0],
     UNIT_M[0],
@@ -107,10 +136,37 @@ IMPERIALS = [
     UNIT_SQMI[0],
 ]
 
+# Indexes for fast lookups.
+UNITS_BY_ID = dict((unit.id, unit) for unit in ALL_UNITS)
+
+SYSTEMS_BY_UNIT = dict(
+    [(unit, SYSTEM_METRIC) for unit in METRICS] +
+    [(unit, SYSTEM_IMPERIAL) for unit in IMPERIALS]
+)
+
 
 class IUnitWidget(ITextWidget):
     """Base unit widget."""
 
+    def remember_number(text, number):
+        """Remember the number a text was converted from or to."""
+
+    def remembered_number(text):
+        """Return the number remembered for a text or ``None``."""
+
+
+class IUnitDataConverter(IDataConverter):
+    """Data converter for numbers shown in unit widgets."""
+
+    type = Attribute('The number type of the field, Decimal or float.')
+
+    def format(value):
+        """Return the text of a number.
+
+        Unlike ``toWidgetValue`` the text is not taken for the field value,
+        it is used for converted values shown in the widget.
+        """
+
 
 class ILengthWidget(IUnitWidget):
     """Unit widget for 'lenght' dimensions."""
@@ -118,3 +174,26 @@ class ILengthWidget(IUnitWidget):
 
 class IAreaWidget(IUnitWidget):
     """Unit widget for 'area' dimensions."""
+
+
+class IUnitForm(Interface):
+    """A form which stores the selected unit systems when applying changes.
+
+    Unit widgets in other forms store the unit system during extraction.
+    """
+
+
+class IQuantity(IMinMax, IField, IFromUnicode):
+    """A quantity stored as a number in the base unit of its dimension."""
+
+    dimension = ASCIILine(
+        title=_(u'Dimension'),
+        description=_(u'The dimension of the quantity, e.g. "area".'),
+        required=True,
+    )
+
+    decimal = Bool(
+        title=_(u'Decimal'),
+        description=_(u'Store Decimal numbers instead of floats.'),
+        default=True,
+    )
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""One JavaScript initializer for all unit widgets of a page.
+
+By default every unit widget renders a script which initializes its unit
+select. If ``ENABLED`` is true (or the ``aggregate_javascript`` attribute of
+a widget), the widgets only register their ids on the request and
+``UnitWidgetsScript`` renders one script for all of them. The content
+provider is registered as ``z3c.formwidget.unit.javascript`` and has to be
+rendered after the widgets, e.g. at the end of the page or in a viewlet
+manager below the content.
+"""
+
+# python imports
+import json
+import string
+
+# zope imports
+from zope.contentprovider.interfaces import IContentProvider
+from zope.interface import implements
+
+
+KEY = 'z3c.formwidget.unit.javascript'
+# The registered widgets converting their values in the browser.
+CONVERT_KEY = KEY + '.convert'
+# Set when ``CONVERT`` was rendered for a request.
+DEFINED_KEY = KEY + '.defined'
+
+# Aggregate the scripts of all widgets which don't decide themselves.
+ENABLED = False
+
+# Converts the value of the input when the unit of a select changes, using
+# the factors, decimal and group symbols of its data attributes. The value
+# is only converted for display, ``extract`` converts the submitted value.
+# Repeated changes convert the value entered last, not the rounded results.
+CONVERT = u"""window.unitWidgetConvert = window.unitWidgetConvert || function(jq, selects){
+  selects.each(function(){
+    jq(this).data('unit', jq(this).val());
+  }).on('change', function(){
+    var select = jq(this), factors = select.data('factors'),
+        decimal = select.data('decimal'), group = select.data('group'),
+        origin = select.data('origin'), to = select.val(),
+        input = document.getElementById(this.id.slice(0, -5)), value, text;
+    if (!origin || origin.text !== (input && input.value)) {
+      origin = {unit: select.data('unit'), value: input && parseFloat(
+        input.value.split(group).join('').replace(decimal, '.'))};
+    }
+    select.data('unit', to).data('origin', null);
+    if (!input || !factors || !factors[origin.unit] || !factors[to] ||
+        isNaN(origin.value)) {
+      return;
+    }
+    value = parseFloat(
+      (origin.value * factors[origin.unit] / factors[to]).toPrecision(12));
+    text = String(value);
+    if (text.indexOf('e') !== -1) {
+      text = value.toFixed(20).replace(/0+$/, '').replace(/\\.$/, '');
+    }
+    input.value = origin.text = text.replace('.', decimal);
+    select.data('origin', origin);
+  });
+};
+"""
+
+# Initializes the conversion of the selects, see ``convert_script``.
+CONVERT_WIDGETS = string.Template(u"""jQuery(function(jq){
+  unitWidgetConvert(jq, jq(${selector}));
+});
+""")
+
+SCRIPT = string.Template(u"""<script type="text/javascript">
+jQuery(function(jq){
+  if (jQuery().selectpicker) {
+    jq(${selector}).selectpicker({});
+  }
+});
+${convert}</script>""")
+
+
+def use_aggregation(widget):
+    """Check if a widget registers its id instead of rendering a script."""
+    aggregate = getattr(widget, 'aggregate_javascript', None)
+    if aggregate is None:
+        return ENABLED
+    return aggregate
+
+
+def _registry(request, create=False, key=KEY):
+    annotations = getattr(request, 'annotations', None)
+    if annotations is None:
+        return None
+    if create:
+        return annotations.setdefault(key, [])
+    return annotations.get(key)
+
+
+def register(request, widget_id, convert=False):
+    """Register a widget id to be initialized by the page script.
+
+    ``convert`` also initializes the conversion of its values (see
+    ``CONVERT``). Return ``False`` if the request can't hold the registry.
+    """
+    ids = _registry(request, create=True)
+    if ids is None:
+        return False
+    if widget_id not in ids:
+        ids.append(widget_id)
+    if convert:
+        converted = _registry(request, create=True, key=CONVERT_KEY)
+        if widget_id not in converted:
+            converted.append(widget_id)
+    return True
+
+
+def _selector(widget_ids):
+    return json.dumps(
+        u', '.join([u'#%s-unit' % widget_id for widget_id in widget_ids]))
+
+
+def convert_script(request, widget_ids):
+    """Return the script converting the values of widgets in the browser.
+
+    ``CONVERT`` is only included in the first script of a request.
+    """
+    script = CONVERT_WIDGETS.substitute(selector=_selector(widget_ids))
+    annotations = getattr(request, 'annotations', None)
+    if annotations is None:
+        return CONVERT + script
+    if not annotations.get(DEFINED_KEY):
+        annotations[DEFINED_KEY] = True
+        script = CONVERT + script
+    return script
+
+
+def render_script(request):
+    """Render the script for all registered widgets and reset the registry.
+
+    Return an empty string if no widget was registered.
+    """
+    ids = _registry(request)
+    if not ids:
+        return u''
+    convert = u''
+    converted = _registry(request, key=CONVERT_KEY)
+    if converted:
+        convert = convert_script(request, converted)
+        del converted[:]
+    selector = _selector(ids)
+    del ids[:]
+    return SCRIPT.substitute(convert=convert, selector=selector)
+
+
+class UnitWidgetsScript(object):
+    """Content provider (or viewlet) initializing all unit widgets."""
+    implements(IContentProvider)
+
+    def __init__(self, context, request, view, manager=None):
+        self.context = context
+        self.request = request
+        self.__parent__ = view
+        self.manager = manager
+
+    def update(self):
+        pass
+
+    def render(self):
+        return render_script(self.request)
@@ -0,0 +1,334 @@
+# -*- coding: utf-8 -*-
+"""Load test of forms with unit widgets.
+
+Run with ``python -m z3c.formwidget.unit.loadtest``, see ``--help`` for the
+options. A form with N unit widgets edits annotatable content in an
+in-memory ZODB. Concurrent workers render the form, validate it or apply
+changes, in a configurable mix. The latency percentiles, the throughput and
+the ZODB conflicts are reported per scenario.
+
+Everything runs in-process, the components are registered like in the
+tests (``tests.setUp``).
+"""
+
+# python imports
+import math
+import optparse
+import random
+import sys
+import threading
+import timeit
+
+# zope imports
+from ZODB.DB import DB
+from ZODB.POSException import ConflictError
+from persistent.list import PersistentList
+from z3c.form import field, form
+from zope.annotation.interfaces import IAttributeAnnotatable
+from zope.interface import implements
+import persistent
+import transaction
+import zope.schema
+
+# local imports
+from z3c.formwidget.unit.form import UnitFormMixin
+from z3c.formwidget.unit.widget import AreaFieldWidget, LengthFieldWidget
+
+
+SCENARIOS = ('render', 'validate', 'apply')
+
+# The default mix: relative weights of the scenarios.
+MIX = {'render': 6, 'validate': 3, 'apply': 1}
+
+PERCENTILES = (50, 90, 99)
+
+AREA_UNITS = ('sq_m', 'ha', 'sq_km', 'sq_ft', 'acre')
+LENGTH_UNITS = ('mm', 'm', 'km', 'in', 'ft', 'mi')
+
+
+class Content(persistent.Persistent):
+    """Content edited by the load test form."""
+    implements(IAttributeAnnotatable)
+
+
+def make_form_class(widgets):
+    """Return an edit form class with ``widgets`` unit widgets.
+
+    Area and length widgets alternate. ``units`` maps the field names to the
+    units which are submitted.
+    """
+    fields = []
+    units = {}
+    for i in range(widgets):
+        name = 'field%d' % i
+        fields.append(field.Field(zope.schema.Decimal(
+            __name__=name, title=u'Field', required=False)))
+        if i % 2:
+            fields[-1].widgetFactory = LengthFieldWidget
+            units[name] = LENGTH_UNITS
+        else:
+            fields[-1].widgetFactory = AreaFieldWidget
+            units[name] = AREA_UNITS
+
+    class LoadTestForm(UnitFormMixin, form.EditForm):
+        pass
+
+    LoadTestForm.fields = field.Fields(*fields)
+    LoadTestForm.units = units
+    return LoadTestForm
+
+
+def parse_mix(spec):
+    """Parse a mix like ``render=6,validate=3,apply=1``."""
+    mix = {}
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError('Unknown scenario: %s' % name)
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def percentile(values, percent):
+    """Return the nearest-rank percentile of sorted ``values``."""
+    if not values:
+        return None
+    index = int(math.ceil(percent / 100.0 * len(values))) - 1
+    return values[max(0, min(len(values) - 1, index))]
+
+
+class Stats(object):
+    """The measurements of one scenario."""
+
+    def __init__(self, name):
+        self.name = name
+        self.latencies = []
+        self.conflicts = 0
+        self.errors = 0
+
+    def summary(self, elapsed):
+        """Return a dict with the count, throughput and percentiles."""
+        latencies = sorted(self.latencies)
+        summary = {
+            'requests': len(latencies),
+            'throughput': elapsed and len(latencies) / elapsed or 0.0,
+            'conflicts': self.conflicts,
+            'errors': self.errors,
+            'max': latencies and latencies[-1] or None,
+        }
+        for percent in PERCENTILES:
+            summary['p%d' % percent] = percentile(latencies, percent)
+        return summary
+
+
+class Worker(threading.Thread):
+    """Send requests with its own connection and transaction manager."""
+
+    def __init__(self, harness, number, requests):
+        super(Worker, self).__init__(name='loadtest-%d' % number)
+        self.harness = harness
+        self.requests = requests
+        self.random = random.Random(harness.seed + number)
+        self.stats = dict((name, Stats(name)) for name in SCENARIOS)
+
+    def run(self):
+        tm = transaction.TransactionManager()
+        connection = self.harness.db.open(transaction_manager=tm)
+        try:
+            root = connection.root()
+            for i in range(self.requests):
+                scenario = self.harness.choose(self.random)
+                content = root['content'][
+                    self.random.randrange(self.harness.objects)]
+                self.request(scenario, content, tm)
+        finally:
+            tm.abort()
+            connection.close()
+
+    def request(self, scenario, content, tm):
+        stats = self.stats[scenario]
+        start = timeit.default_timer()
+        tm.begin()
+        try:
+            getattr(self, scenario)(content, tm)
+        except ConflictError:
+            tm.abort()
+            stats.conflicts += 1
+        except Exception:
+            tm.abort()
+            stats.errors += 1
+        stats.latencies.append(timeit.default_timer() - start)
+
+    def form_values(self):
+        values = {}
+        for name, units in self.harness.form_class.units.items():
+            name = 'form.widgets.' + name
+            values[name] = u'%d' % self.random.randrange(1, 10000000)
+            values[name + '-unit'] = self.random.choice(units)
+        return values
+
+    def render(self, content, tm):
+        from z3c.form.testing import TestRequest
+        edit_form = self.harness.form_class(content, TestRequest())
+        edit_form.update()
+        for widget in edit_form.widgets.values():
+            widget.render()
+        tm.abort()
+
+    def validate(self, content, tm):
+        from z3c.form.testing import TestRequest
+        edit_form = self.harness.form_class(
+            content, TestRequest(form=self.form_values()))
+        edit_form.update()
+        edit_form.extractData()
+        tm.abort()
+
+    def apply(self, content, tm):
+        from z3c.form.testing import TestRequest
+        edit_form = self.harness.form_class(
+            content, TestRequest(form=self.form_values()))
+        edit_form.update()
+        data, errors = edit_form.extractData()
+        edit_form.applyChanges(data)
+        tm.commit()
+
+
+class LoadTest(object):
+    """A load test of a form with unit widgets.
+
+    ``widgets`` is the number of unit widgets of the form, ``objects`` the
+    number of content objects the workers edit. ``mix`` maps the scenarios
+    to their relative weights.
+    """
+
+    def __init__(self, widgets=10, workers=4, requests=100, mix=None,
+                 objects=1, seed=0):
+        self.widgets = widgets
+        self.workers = workers
+        self.requests = requests
+        self.mix = mix or MIX
+        self.objects = objects
+        self.seed = seed
+        self.form_class = make_form_class(widgets)
+        self._choices = []
+        for name in SCENARIOS:
+            self._choices.extend([name] * self.mix.get(name, 0))
+        if not self._choices:
+            raise ValueError('The mix contains no requests.')
+
+    def choose(self, rand):
+        return rand.choice(self._choices)
+
+    def setup_database(self):
+        """Create the in-memory database with the content objects."""
+        # One connection per worker, without warnings about the pool size.
+        self.db = DB(None, pool_size=max(7, self.workers + 1))
+        tm = transaction.TransactionManager()
+        connection = self.db.open(transaction_manager=tm)
+        connection.root()['content'] = PersistentList(
+            [Content() for i in range(self.objects)])
+        tm.commit()
+        connection.close()
+
+    def run(self):
+        """Run the load test.
+
+        Return a mapping of the scenarios (and ``total``) to their
+        summaries, see ``Stats.summary``.
+        """
+        self.setup_database()
+        try:
+            workers = [
+                Worker(self, number, self.requests)
+                for number in range(self.workers)
+            ]
+            start = timeit.default_timer()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            elapsed = timeit.default_timer() - start
+        finally:
+            self.db.close()
+
+        results = {}
+        total = Stats('total')
+        for name in SCENARIOS:
+            stats = Stats(name)
+            for worker in workers:
+                stats.latencies.extend(worker.stats[name].latencies)
+                stats.conflicts += worker.stats[name].conflicts
+                stats.errors += worker.stats[name].errors
+            if stats.latencies:
+                results[name] = stats.summary(elapsed)
+            total.latencies.extend(stats.latencies)
+            total.conflicts += stats.conflicts
+            total.errors += stats.errors
+        results['total'] = total.summary(elapsed)
+        return results
+
+
+def print_report(results):
+    print('%-10s %9s %10s %9s %9s %9s %9s %9s %7s' % (
+        'scenario', 'requests', 'req/s', 'p50 ms', 'p90 ms', 'p99 ms',
+        'max ms', 'conflicts', 'errors'))
+    for name in SCENARIOS + ('total',):
+        summary = results.get(name)
+        if summary is None:
+            continue
+        print('%-10s %9d %10.1f %9.1f %9.1f %9.1f %9.1f %9d %7d' % (
+            name, summary['requests'], summary['throughput'],
+            summary['p50'] * 1000, summary['p90'] * 1000,
+            summary['p99'] * 1000, summary['max'] * 1000,
+            summary['conflicts'], summary['errors']))
+
+
+def main(args=None):
+    parser = optparse.OptionParser(
+        prog='python -m z3c.formwidget.unit.loadtest',
+        description=__doc__.splitlines()[0])
+    parser.add_option(
+        '-w', '--widgets', type='int', default=10,
+        help='Unit widgets of the form (default: 10).')
+    parser.add_option(
+        '-c', '--workers', type='int', default=4,
+        help='Concurrent workers (default: 4).')
+    parser.add_option(
+        '-n', '--requests', type='int', default=100,
+        help='Requests per worker (default: 100).')
+    parser.add_option(
+        '-m', '--mix', default='render=6,validate=3,apply=1',
+        help='Weights of the scenarios (default: render=6,validate=3,'
+             'apply=1).')
+    parser.add_option(
+        '-o', '--objects', type='int', default=1,
+        help='Content objects the workers edit (default: 1).')
+    parser.add_option(
+        '--seed', type='int', default=0,
+        help='Seed of the random requests (default: 0).')
+    options, arguments = parser.parse_args(args)
+    try:
+        mix = parse_mix(options.mix)
+    except ValueError as error:
+        parser.error(str(error))
+
+    from z3c.formwidget.unit import tests
+    setup = tests.setUpComponents()
+    try:
+        results = LoadTest(
+            widgets=options.widgets,
+            workers=options.workers,
+            requests=options.requests,
+            mix=mix,
+            objects=options.objects,
+            seed=options.seed,
+        ).run()
+    finally:
+        tests.tearDown(setup)
+    print_report(results)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
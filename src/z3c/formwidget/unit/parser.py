@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""Parser for quantities entered as text, e.g. "12 ft 3 in" or "1,5 km²".
+
+The parser knows the unit ids, the short labels of ``interfaces`` and some
+common aliases. It uses one precompiled regular expression instead of
+pint's expression parser. The values of compound inputs are summed.
+"""
+
+# python imports
+from decimal import Decimal, InvalidOperation
+import re
+import threading
+
+# local imports
+from z3c.formwidget.unit import conversion, interfaces
+
+
+# Additional names of units, mapped to unit ids.
+ALIASES = {
+    u'm2': 'sq_m',
+    u'sq m': 'sq_m',
+    u'km2': 'sq_km',
+    u'sq km': 'sq_km',
+    u'ft2': 'sq_ft',
+    u'ft²': 'sq_ft',
+    u'sq. ft': 'sq_ft',
+    u'mi2': 'sq_mi',
+    u'mi²': 'sq_mi',
+    u'sq. mi': 'sq_mi',
+    u'acres': 'acre',
+    u'ac': 'acre',
+    u'meter': 'm',
+    u'meters': 'm',
+    u'metre': 'm',
+    u'metres': 'm',
+    u'feet': 'ft',
+    u'foot': 'ft',
+    u"'": 'ft',
+    u'inch': 'in',
+    u'inches': 'in',
+    u'"': 'in',
+    u'yards': 'yd',
+    u'yard': 'yd',
+    u'miles': 'mi',
+    u'mile': 'mi',
+}
+
+# Digits with decimal and group symbols (including non-breaking spaces).
+NUMBER = u'[+-]?(?:\\d(?:[\\d.,\u00a0\u202f]*\\d)?|[.,]\\d+)'
+
+_lock = threading.Lock()
+_parser = None
+
+
+def get_units():
+    """Return a mapping of all known unit names (lower case) to unit ids."""
+    units = {}
+    for unit in interfaces.ALL_UNITS:
+        for name in (unit.id, unit.id.replace('_', ' '), unit.label_short):
+            if name:
+                units[u'%s' % name.lower()] = unit.id
+    units.update(ALIASES)
+    return dict(
+        (name, unit) for name, unit in units.items()
+        if conversion.has_unit(unit)
+    )
+
+
+def compile_parser(units):
+    """Compile the expression matching one number and its unit."""
+    names = sorted(units, key=lambda name: (-len(name), name))
+    return re.compile(
+        # Units ending with a letter must not be followed by one.
+        u'\\s*(?P<number>%s)\\s*(?P<unit>%s)(?:(?<=\\w)(?!\\w)|(?<!\\w))'
+        u'\\s*' % (
+            NUMBER, u'|'.join([re.escape(name) for name in names])),
+        re.IGNORECASE | re.UNICODE,
+    )
+
+
+def get_parser():
+    """Return the (units, expression) tuple, build it if necessary."""
+    global _parser
+    parser = _parser
+    if parser is None:
+        with _lock:
+            if _parser is None:
+                units = get_units()
+                _parser = (units, compile_parser(units))
+            parser = _parser
+    return parser
+
+
+def reset():
+    """Drop the expression, it is rebuilt for the current units."""
+    global _parser
+    _parser = None
+
+
+def parse_number(text, decimal=u'.', group=u','):
+    """Parse a number using the decimal and group symbols of a locale."""
+    text = text.replace(group, u'')
+    if group.isspace():
+        # Accept all kinds of non-breaking spaces for grouping.
+        text = text.replace(u'\u00a0', u'').replace(u'\u202f', u'')
+    try:
+        return Decimal(text.replace(decimal, u'.'))
+    except InvalidOperation:
+        raise ValueError('Invalid number: %r' % text)
+
+
+def parse(text, dimension, decimal=u'.', group=u','):
+    """Parse a quantity of a dimension.
+
+    Return a tuple of the magnitude in the base unit (a ``Decimal``) and the
+    first unit, e.g. ``(Decimal('3.7338'), 'ft')`` for ``12 ft 3 in``.
+    Return ``None`` if ``text`` doesn't contain a quantity with units. Raise
+    ``ValueError`` for units of other dimensions.
+    """
+    units, expression = get_parser()
+    base_unit = interfaces.BASE_UNITS[dimension]
+    position = 0
+    length = len(text)
+    total = Decimal(0)
+    first_unit = None
+    while position < length:
+        match = expression.match(text, position)
+        if match is None:
+            return None
+        unit = units[match.group('unit').lower()]
+        number = parse_number(match.group('number'), decimal, group)
+        try:
+            total += conversion.convert(number, unit, base_unit)
+        except KeyError:
+            raise ValueError('Unit %s is not a unit of %s' % (unit, dimension))
+        if first_unit is None:
+            first_unit = unit
+        position = match.end()
+    if first_unit is None:
+        return None
+    return total, first_unit
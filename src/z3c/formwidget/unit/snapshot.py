@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""Precompiled snapshot of the unit conversion factors.
+
+Resolving the factors of pint's built-in units requires a full pint
+``UnitRegistry``, which takes a noticeable amount of time to create. The
+snapshot stores the resolved factors in a small JSON file, so the conversion
+table can be built without pint. Build it with the ``unit-snapshot`` command
+(or ``python -m z3c.formwidget.unit.snapshot``).
+"""
+
+# python imports
+from fractions import Fraction
+import hashlib
+import json
+import os
+import sys
+
+# local imports
+from z3c.formwidget.unit import DEFINITIONS
+
+
+SNAPSHOT = os.path.join(os.path.dirname(__file__), 'units.json')
+ENVIRONMENT_KEY = 'Z3C_FORMWIDGET_UNIT_SNAPSHOT'
+
+
+def get_path():
+    """Return the path of the snapshot file."""
+    return os.environ.get(ENVIRONMENT_KEY) or SNAPSHOT
+
+
+def _signature():
+    """Return the pint version and the checksum of ``pint_units.txt``.
+
+    A snapshot is only used if both match, because pint's built-in
+    definitions differ between versions.
+    """
+    import pint
+    with open(DEFINITIONS, 'rb') as definition_file:
+        checksum = hashlib.sha1(definition_file.read()).hexdigest()
+    return getattr(pint, '__version__', None), checksum
+
+
+def dump(factors, path=None):
+    """Write the ``factors`` table to a snapshot file."""
+    pint_version, checksum = _signature()
+    data = {
+        'pint': pint_version,
+        'definitions': checksum,
+        'factors': dict(
+            (unit, [dimension, factor.numerator, factor.denominator])
+            for unit, (dimension, factor) in factors.items()
+        ),
+    }
+    with open(path or get_path(), 'w') as snapshot_file:
+        json.dump(data, snapshot_file, indent=1, sort_keys=True)
+
+
+def load(path=None, units=None):
+    """Load the factor table from a snapshot file.
+
+    Return ``None`` if there is no snapshot, if it is outdated or if it
+    doesn't contain all ``units``.
+    """
+    path = path or get_path()
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as snapshot_file:
+            data = json.load(snapshot_file)
+    except (IOError, ValueError):
+        return None
+    if (data.get('pint'), data.get('definitions')) != _signature():
+        return None
+    factors = {}
+    for unit, (dimension, numerator, denominator) in \
+            data.get('factors', {}).items():
+        factors[str(unit)] = (str(dimension), Fraction(numerator, denominator))
+    for unit in units or []:
+        if unit not in factors:
+            return None
+    return factors
+
+
+def main(args=None):
+    """Build the snapshot file."""
+    from z3c.formwidget.unit import conversion
+    if args is None:
+        args = sys.argv[1:]
+    path = args and args[0] or get_path()
+    dump(conversion.build_factors(), path)
+    print('Wrote unit snapshot to %s.' % path)
+
+
+if __name__ == '__main__':
+    main()
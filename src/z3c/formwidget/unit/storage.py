@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""Persistent storage for the unit systems selected in unit widgets."""
+
+# zope imports
+from persistent.dict import PersistentDict
+
+try:
+    from ZODB.POSException import ConflictError
+except ImportError:
+    # The ZODB is optional, only the ZODB resolves conflicts.
+    class ConflictError(Exception):
+        """A conflict which can't be resolved."""
+
+
+_MISSING = object()
+
+
+def _data(state):
+    """Return the key of the mapping data and the data of a state."""
+    for key in ('data', '_container'):
+        if key in state:
+            return key, state[key]
+    raise ConflictError('Unknown state of unit system storage.')
+
+
+class UnitSystems(PersistentDict):
+    """Mapping of widget names to unit systems.
+
+    Concurrent transactions changing the unit systems of different widgets
+    don't conflict. Only changing the system of the same widget to different
+    values is a conflict.
+    """
+
+    def _p_resolveConflict(self, old_state, saved_state, new_state):
+        key, old = _data(old_state)
+        saved = _data(saved_state)[1]
+        new = _data(new_state)[1]
+        resolved = dict(saved)
+        for name in set(old) | set(saved) | set(new):
+            old_value = old.get(name, _MISSING)
+            saved_value = saved.get(name, _MISSING)
+            new_value = new.get(name, _MISSING)
+            if new_value == old_value or new_value == saved_value:
+                # Unchanged by us or changed the same way by both.
+                continue
+            if saved_value != old_value:
+                raise ConflictError(
+                    'Unit system of %r changed concurrently.' % name)
+            if new_value is _MISSING:
+                del resolved[name]
+            else:
+                resolved[name] = new_value
+        state = dict(new_state)
+        state[key] = resolved
+        return state
@@ -7,13 +7,44 @@ import unittest
 
 # zope imports
 from z3c.form import testing
+from zope.annotation.attribute import AttributeAnnotations
+from zope.annotation.interfaces import IAttributeAnnotatable
+import persistent
+import transaction
 import z3c.form
 import zope.component
 import zope.interface
 import zope.schema
 
+try:
+    import zope.catalog
+    HAS_CATALOG = True
+except ImportError:
+    HAS_CATALOG = False
+
 # local imports
-from z3c.formwidget.unit import interfaces, widget
+from z3c.formwidget.unit import (
+    benchmark,
+    converter,
+    interfaces,
+    utils,
+    widget,
+)
+
+
+class IPlot(zope.interface.Interface):
+    """A plot of land."""
+
+    area = zope.schema.Decimal(title=u'Area', required=False)
+    width = zope.schema.Decimal(title=u'Width', required=False)
+
+
+class Plot(persistent.Persistent):
+    """A plot of land."""
+    zope.interface.implements(IPlot, IAttributeAnnotatable)
+
+    area = None
+    width = None
 
 
 def setUp(test):
@@ -21,22 +52,158 @@ def setUp(test):
     testing.setUp(test)
     testing.setupFormDefaults()
     # Widget setup
-    template = os.path.join(os.path.dirname(__file__), 'templates', 'input.pt')
-    factory = z3c.form.widget.WidgetTemplateFactory(
-        template,
-        widget=interfaces.IUnitWidget,
-    )
-    zope.component.provideAdapter(factory, name='input')
+    for mode in ('input', 'display'):
+        template = os.path.join(
+            os.path.dirname(__file__), 'templates', mode + '.pt')
+        factory = z3c.form.widget.WidgetTemplateFactory(
+            template,
+            widget=interfaces.IUnitWidget,
+        )
+        zope.component.provideAdapter(factory, name=mode)
     zope.component.provideAdapter(widget.AreaFieldWidget)
     zope.component.provideAdapter(widget.LengthFieldWidget)
+    zope.component.provideAdapter(widget.QuantityFieldWidget)
+    zope.component.provideAdapter(converter.QuantityDataConverter)
+    zope.component.provideAdapter(converter.UnitDecimalDataConverter)
+    zope.component.provideAdapter(converter.UnitFloatDataConverter)
+    zope.component.provideAdapter(AttributeAnnotations)
+
+
+class ComponentSetup(object):
+    """Stand-in for the test ``setUp`` expects."""
+
+    def __init__(self):
+        self.globs = {}
+
+
+def setUpComponents():
+    """Register the components of the tests for scripts (benchmarks, load
+    tests) and return the setup for ``tearDown``."""
+    setup = ComponentSetup()
+    setUp(setup)
+    return setup
+
+
+def tearDown(test):
+    testing.tearDown(test)
+    tearDownLadders(test)
+
+
+def tearDownLadders(test):
+    # Remove the ladders registered by the test.
+    utils.reset_ladders()
+
+
+def tearDownIndex(test):
+    transaction.abort()
+
+
+class BenchmarkTest(unittest.TestCase):
+    """Run the benchmark suite in the test runner."""
+
+    def test_suite(self):
+        results = benchmark.run_suite(scale=0.1)
+        path = os.environ.get(benchmark.ENVIRONMENT_KEY)
+        if path and os.path.exists(path):
+            failures = benchmark.check_baseline(
+                results, benchmark.load_baseline(path))
+            self.assertEqual(failures, [])
+
+    def test_threads(self):
+        # The rates depend on the machine and its load, only the structure
+        # is checked. ``benchmark.py --compare`` shows the scaling.
+        results = benchmark.bench_threads(threads=(1, 4, 16), size=10000)
+        self.assertEqual([count for count, ops in results], [1, 4, 16])
+        for count, ops in results:
+            self.assertTrue(ops > 0, (count, ops))
 
 
 def test_suite():
-    return unittest.TestSuite((
+    suite = unittest.TestSuite((
         doctest.DocFileSuite(
             'widget.txt',
             setUp=setUp,
+            tearDown=tearDown,
+            optionflags=doctest.NORMALIZE_WHITESPACE | doctest.ELLIPSIS,
+        ),
+        doctest.DocFileSuite(
+            'form.txt',
+            setUp=setUp,
+            tearDown=tearDown,
+            optionflags=doctest.NORMALIZE_WHITESPACE | doctest.ELLIPSIS,
+        ),
+        doctest.DocFileSuite(
+            'field.txt',
+            setUp=setUp,
+            tearDown=tearDown,
+            optionflags=doctest.NORMALIZE_WHITESPACE | doctest.ELLIPSIS,
+        ),
+        doctest.DocFileSuite(
+            'parser.txt',
+            setUp=setUp,
+            tearDown=tearDown,
+            optionflags=doctest.NORMALIZE_WHITESPACE | doctest.ELLIPSIS,
+        ),
+        doctest.DocFileSuite(
+            'bulk.txt',
+            optionflags=doctest.NORMALIZE_WHITESPACE | doctest.ELLIPSIS,
+        ),
+        doctest.DocFileSuite(
+            'instrumentation.txt',
+            setUp=setUp,
+            tearDown=tearDown,
+            optionflags=doctest.NORMALIZE_WHITESPACE | doctest.ELLIPSIS,
+        ),
+        doctest.DocFileSuite(
+            'concurrency.txt',
+            setUp=setUp,
+            tearDown=tearDown,
+            optionflags=doctest.NORMALIZE_WHITESPACE | doctest.ELLIPSIS,
+        ),
+        doctest.DocFileSuite(
+            'loadtest.txt',
+            setUp=setUp,
+            tearDown=tearDown,
+            optionflags=doctest.NORMALIZE_WHITESPACE | doctest.ELLIPSIS,
+        ),
+        doctest.DocFileSuite(
+            'warmup.txt',
+            setUp=setUp,
+            tearDown=tearDown,
+            optionflags=doctest.NORMALIZE_WHITESPACE | doctest.ELLIPSIS,
+        ),
+        doctest.DocFileSuite(
+            'conversion.txt',
+            optionflags=doctest.NORMALIZE_WHITESPACE | doctest.ELLIPSIS,
+        ),
+        doctest.DocFileSuite(
+            'utils.txt',
+            tearDown=tearDownLadders,
+            optionflags=doctest.NORMALIZE_WHITESPACE | doctest.ELLIPSIS,
+        ),
+        doctest.DocFileSuite(
+            'catalogs.txt',
+            setUp=testing.setUp,
             tearDown=testing.tearDown,
             optionflags=doctest.NORMALIZE_WHITESPACE | doctest.ELLIPSIS,
         ),
     ))
+    if HAS_CATALOG:
+        suite.addTest(doctest.DocFileSuite(
+            'index.txt',
+            globs={'count': 1000},
+            tearDown=tearDownIndex,
+            optionflags=doctest.NORMALIZE_WHITESPACE | doctest.ELLIPSIS,
+        ))
+        # Index 100,000 objects with ``--at-level 2``.
+        large = doctest.DocFileSuite(
+            'index.txt',
+            globs={'count': 100000},
+            tearDown=tearDownIndex,
+            optionflags=doctest.NORMALIZE_WHITESPACE | doctest.ELLIPSIS,
+        )
+        large.level = 2
+        suite.addTest(large)
+    if os.environ.get(benchmark.ENVIRONMENT_KEY):
+        suite.addTest(unittest.makeSuite(BenchmarkTest))
+    return suite
@@ -1,41 +1,215 @@
 # -*- coding: utf-8 -*-
 """Unit conversion utilities."""
 
+# python imports
+from bisect import bisect_right
+
+try:
+    import numpy
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
 # local imports
-from z3c.formwidget.unit import interfaces
+from z3c.formwidget.unit import cache, conversion, interfaces, parser
 
 
-def get_best_unit(value, system, dimension, level_min=0, level_max=None):
-    """Return the unit that fits best."""
-    level = 0
-    if dimension == interfaces.DIMENSION_AREA:
-        level = 0
-        if value < 5000:
-            level = 0
-        elif value < 4000000:
-            level = 1
-        else:
-            level = 2
-    elif dimension == interfaces.DIMENSION_LENGTH:
-        level = 1
-        if value < 0.5:
-            level = 0
-        elif value < 400:
-            level = 1
-        else:
-            level = 2
+# Default upper bounds (in base units) of the unit levels of a dimension.
+THRESHOLDS = {
+    interfaces.DIMENSION_AREA: [5000, 4000000],
+    interfaces.DIMENSION_LENGTH: [0.5, 400],
+}
+
+SYSTEM_UNITS = {
+    interfaces.SYSTEM_METRIC: interfaces.METRICS,
+    interfaces.SYSTEM_IMPERIAL: interfaces.IMPERIALS,
+}
+
+# Mapping of (system, dimension) tuples to (thresholds, units) tuples.
+LADDERS = {}
+
+
+def compile_ladders():
+    """Compile the ladders for all units in ``interfaces.UNITS``."""
+    for system, dimensions in interfaces.UNITS.items():
+        for dimension, units in dimensions.items():
+            LADDERS[(system, dimension)] = (
+                tuple(sorted(THRESHOLDS.get(dimension, []))),
+                tuple(units),
+            )
+
+
+compile_ladders()
+
+
+def _copy_registries(units, all_units, units_by_id, systems_by_unit,
+                     base_units, system_units, ladders):
+    """Return copies of the registries changed by ``register_ladder``."""
+    return (
+        dict(
+            (system, dict(
+                (dimension, list(dimension_units))
+                for dimension, dimension_units in dimensions.items()))
+            for system, dimensions in units.items()),
+        list(all_units),
+        dict(units_by_id),
+        dict(systems_by_unit),
+        dict(base_units),
+        dict((system, list(ids)) for system, ids in system_units.items()),
+        dict(ladders),
+    )
+
+
+# The units and ladders defined by the package, see ``reset_ladders``.
+_DEFAULTS = _copy_registries(
+    interfaces.UNITS,
+    interfaces.ALL_UNITS,
+    interfaces.UNITS_BY_ID,
+    interfaces.SYSTEMS_BY_UNIT,
+    interfaces.BASE_UNITS,
+    SYSTEM_UNITS,
+    LADDERS,
+)
+
+
+def _get_unit(unit):
+    """Return the unit record for a unit tuple or id."""
+    if isinstance(unit, interfaces.Unit):
+        return unit
+    if isinstance(unit, tuple):
+        return interfaces.Unit(*unit)
+    known_unit = interfaces.UNITS_BY_ID.get(unit)
+    if known_unit is not None:
+        return known_unit
+    return interfaces.Unit(unit, u'%s' % unit, u'%s' % unit, None)
+
+
+def register_ladder(system, dimension, units, thresholds, base_unit=None):
+    """Register the units of a system and dimension.
 
+    ``units`` is a list of unit records (see ``interfaces``) or unit ids
+    ordered by level. ``thresholds`` are the upper bounds of all levels but
+    the last one, given in ``base_unit``. The base unit is only required if
+    the dimension isn't known yet.
+    """
+    units = [_get_unit(unit) for unit in units]
+    thresholds = sorted(thresholds)
+    if not units or len(thresholds) >= len(units):
+        raise ValueError(
+            'A ladder needs more units than thresholds: %s, %s' % (
+                system, dimension))
+    if base_unit is not None:
+        interfaces.BASE_UNITS[dimension] = base_unit
+    elif dimension not in interfaces.BASE_UNITS:
+        raise ValueError('No base unit for dimension: %s' % dimension)
+
+    interfaces.UNITS.setdefault(system, {})[dimension] = units
+    system_units = SYSTEM_UNITS.get(system)
+    for unit in units:
+        if unit.id not in interfaces.UNITS_BY_ID:
+            interfaces.ALL_UNITS.append(unit)
+        interfaces.UNITS_BY_ID[unit.id] = unit
+        interfaces.SYSTEMS_BY_UNIT[unit.id] = system
+        if system_units is not None and unit.id not in system_units:
+            system_units.append(unit.id)
+    LADDERS[(system, dimension)] = (tuple(thresholds), tuple(units))
+    # The new units need conversion factors and unit options.
+    _reset_caches()
+
+
+def reset_ladders():
+    """Remove the ladders and units registered with ``register_ladder``.
+
+    Only the units and ladders defined by the package are left, e.g. for the
+    tear down of tests.
+    """
+    (units, all_units, units_by_id, systems_by_unit, base_units,
+     system_units, ladders) = _copy_registries(*_DEFAULTS)
+    interfaces.UNITS.clear()
+    interfaces.UNITS.update(units)
+    interfaces.ALL_UNITS[:] = all_units
+    interfaces.UNITS_BY_ID.clear()
+    interfaces.UNITS_BY_ID.update(units_by_id)
+    interfaces.SYSTEMS_BY_UNIT.clear()
+    interfaces.SYSTEMS_BY_UNIT.update(systems_by_unit)
+    interfaces.BASE_UNITS.clear()
+    interfaces.BASE_UNITS.update(base_units)
+    for system, ids in system_units.items():
+        SYSTEM_UNITS[system][:] = ids
+    LADDERS.clear()
+    LADDERS.update(ladders)
+    _reset_caches()
+
+
+def _reset_caches():
+    """Drop the conversion factors and unit options of the old units."""
+    conversion.reset()
+    parser.reset()
+    cache.clear('options')
+    cache.clear('select')
+    cache.clear('format')
+
+
+def _clip_level(level, level_min=0, level_max=None):
     level = max(level_min, level)
     if level_max is not None:
         level = min(level_max, level)
-    unit = interfaces.UNITS.get(
-        system,
-        {}).get(dimension, [(None,)])[level]
-    return unit
+    return level
+
+
+def get_best_unit(value, system, dimension, level_min=0, level_max=None):
+    """Return the unit that fits best."""
+    ladder = LADDERS.get((system, dimension))
+    if ladder is None:
+        return (None,)
+    thresholds, units = ladder
+    return units[_clip_level(
+        bisect_right(thresholds, value), level_min, level_max)]
+
+
+def convert_many(values, system, dimension, level_min=0, level_max=None,
+                 use_numpy=None):
+    """Convert many base unit values to the units that fit best.
+
+    ``values`` is a sequence or NumPy array of magnitudes in the base unit of
+    ``dimension``. Return a tuple of the converted magnitudes and the unit
+    ids. Both are NumPy arrays if NumPy is used, lists otherwise. NumPy is
+    used if it is installed, unless ``use_numpy`` is ``False``.
+    """
+    ladder = LADDERS.get((system, dimension))
+    base_unit = interfaces.BASE_UNITS.get(dimension)
+    if ladder is None or base_unit is None:
+        raise ValueError(
+            'Unknown system or dimension: %s, %s' % (system, dimension))
+    thresholds, units = ladder
+    # Map every possible level of the thresholds to the unit used for it.
+    unit_ids = [
+        units[_clip_level(level, level_min, level_max)][0]
+        for level in range(len(thresholds) + 1)
+    ]
+    if use_numpy is None:
+        use_numpy = HAS_NUMPY
+
+    if use_numpy:
+        ratios = conversion.get_ratios()
+        values = numpy.asarray(values, dtype=float)
+        levels = numpy.searchsorted(thresholds, values, side='right')
+        factors = numpy.array([
+            ratios[(base_unit, unit_id)][2] for unit_id in unit_ids
+        ])
+        return (
+            values * factors[levels],
+            numpy.array(unit_ids, dtype=object)[levels],
+        )
+
+    magnitudes = []
+    result_units = []
+    for value in values:
+        unit_id = unit_ids[bisect_right(thresholds, value)]
+        magnitudes.append(conversion.convert(value, base_unit, unit_id))
+        result_units.append(unit_id)
+    return magnitudes, result_units
 
 
 def system_for_unit(unit_name):
-    if unit_name in interfaces.METRICS:
-        return interfaces.SYSTEM_METRIC
-    elif unit_name in interfaces.IMPERIALS:
-        return interfaces.SYSTEM_IMPERIAL
+    return interfaces.SYSTEMS_BY_UNIT.get(unit_name)
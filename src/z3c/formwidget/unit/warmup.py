@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""Build the caches of the unit widgets before the first request.
+
+Preforking servers should call ``prewarm`` (or use the ``z3c:prewarm`` ZCML
+directive) in the master process, so the children share the warmed state
+instead of building it on their first request.
+"""
+
+# python imports
+from pint import DimensionalityError, UndefinedUnitError
+
+# zope imports
+from zope.component import getGlobalSiteManager
+from zope.pagetemplate.interfaces import IPageTemplate
+
+# local imports
+from z3c.formwidget.unit import conversion, interfaces, parser
+from z3c.formwidget.unit.field import Quantity
+from z3c.formwidget.unit.widget import QuantityWidget
+
+
+def resolve_units():
+    """Build the conversion table and the quantity parser.
+
+    Units of ``interfaces.ALL_UNITS`` which are not part of a ladder (e.g.
+    ``yd``) are resolved with pint and added to the table. Return the number
+    of resolved units.
+    """
+    table = conversion.get_table()
+    resolved = 0
+    for unit in interfaces.ALL_UNITS:
+        if unit.id in table.factors:
+            resolved += 1
+            continue
+        for base_unit in sorted(set(interfaces.BASE_UNITS.values())):
+            try:
+                conversion.add_ratio(unit.id, base_unit)
+            except (DimensionalityError, UndefinedUnitError):
+                continue
+            conversion.add_ratio(base_unit, unit.id)
+            resolved += 1
+            break
+    parser.get_parser()
+    return resolved
+
+
+def compile_templates():
+    """Compile the registered templates of the unit widgets.
+
+    Return the number of compiled templates.
+    """
+    compiled = 0
+    for registration in getGlobalSiteManager().registeredAdapters():
+        if registration.provided is not IPageTemplate or \
+                len(registration.required) != 5:
+            continue
+        if not registration.required[4].isOrExtends(
+                interfaces.IUnitWidget):
+            continue
+        template = registration.factory(None, None, None, None, None)
+        cook = getattr(template, '_cook_check', None) or \
+            getattr(template, 'cook_check', None)
+        if cook is not None:
+            cook()
+            compiled += 1
+    return compiled
+
+
+def translate_options(languages):
+    """Translate the unit options of all dimensions for ``languages``.
+
+    The options of widgets with the default unit systems and levels are
+    cached, including the markup of the unit select for every selected
+    unit. Return the number of cached option lists.
+    """
+    cached = 0
+    for dimension in sorted(interfaces.BASE_UNITS):
+        widget = QuantityWidget(None)
+        widget.field = Quantity(dimension=dimension)
+        for language in languages:
+            widget.unit = None
+            units = [None]
+            for group in widget.items(language):
+                units.extend([member['id'] for member in group['member']])
+            cached += 1
+            for unit in units:
+                widget.unit = unit
+                widget.options_markup(language)
+    return cached
+
+
+def prewarm(languages=(), templates=True):
+    """Build the conversion table, compile the templates and translate the
+    unit options for ``languages``.
+
+    Return a mapping of the steps to the number of warmed items.
+    """
+    result = {'units': resolve_units()}
+    if templates:
+        result['templates'] = compile_templates()
+    if languages:
+        result['options'] = translate_options(languages)
+    return result
@@ -13,10 +13,10 @@ except ImportError:
     HAS_BS_SELECT = False
 
 # zope imports
-from persistent.dict import PersistentDict
 from z3c.form.widget import FieldWidget
 from z3c.form.browser.text import TextWidget
 from z3c.form.interfaces import (
+    DISPLAY_MODE,
     IDataConverter,
     IFieldWidget,
     IFormLayer,
@@ -25,6 +25,7 @@ from z3c.form.interfaces import (
 from zope.annotation.interfaces import IAnnotations
 from zope.component import adapter
 from zope.i18n import translate
+from zope.i18nmessageid import Message
 from zope.security.proxy import Proxy, removeSecurityProxy
 from zope.interface import (
     implementer,
@@ -33,12 +34,57 @@ from zope.interface import (
 from zope.schema.interfaces import ITextLine
 
 # local imports
-from z3c.formwidget.unit import interfaces, ureg, utils
-from z3c.formwidget.unit.i18n import _
+from z3c.formwidget.unit import (
+    cache,
+    conversion,
+    display,
+    interfaces,
+    javascript,
+    parser,
+    ureg,
+    utils,
+)
+from z3c.formwidget.unit.i18n import _, negotiate_language
+from z3c.formwidget.unit.storage import UnitSystems
+
+
+try:
+    string_types = basestring
+except NameError:
+    string_types = str
 
 
 KEY = 'z3c.formwidget.unit'
 
+OPTIONS_CACHE = cache.get_cache('options', maxsize=256)
+
+SELECT_CACHE = cache.get_cache('select', maxsize=1024)
+
+# Display values and units of stored values, see ``_format_key``.
+FORMAT_CACHE = cache.get_cache('format', maxsize=4096)
+
+
+def get_unit_systems(context):
+    """Return the unit systems stored for a context.
+
+    Return ``None`` if the context can't be annotated.
+    """
+    if isinstance(context, Proxy):
+        context = removeSecurityProxy(context)
+    try:
+        annotations = IAnnotations(context)
+    except:
+        return None
+    else:
+        return annotations.get(KEY, {})
+
+
+def _number_type(converter):
+    """Return the number type of a unit data converter or ``None``."""
+    if interfaces.IUnitDataConverter.providedBy(converter):
+        return converter.type
+    return None
+
 
 class MultiUnitWidget(TextWidget):
     """Multi Unit Widget based on TextWidget."""
@@ -47,6 +93,7 @@ class MultiUnitWidget(TextWidget):
     klass = u'multiunit-widget'
     value = u''
     unit = None
+    unit_system = None
 
     unit_systems = (
         interfaces.SYSTEM_METRIC,
@@ -56,16 +103,44 @@ class MultiUnitWidget(TextWidget):
     level_min = 0
     level_max = None
 
+    # Render the display mode without the page template (see ``display``).
+    # ``None`` uses the global setting.
+    fast_display = None
+
     data_header = _(u'Select a unit')
     data_width = '75px'
 
-    _javascript_input = """
+    # Register the widget for the page script (see ``javascript``) instead
+    # of rendering a script. ``None`` uses the global setting.
+    aggregate_javascript = None
+
+    # Convert the displayed value in the browser when the unit changes.
+    client_conversion = False
+
+    # Render the options of the unit select from a cache instead of the
+    # loop in the template.
+    select_cache = True
+
+    # Remember the display value and unit of stored values in a process wide
+    # cache (``FORMAT_CACHE``).
+    format_cache = True
+
+    # The cached widget value, see ``widget_value``.
+    _cache = None
+    # The data converter, see ``data_converter``.
+    _converter = None
+    # The submitted unit, stored by ``store_unit_system``.
+    _pending_unit = None
+    # The last (text, number) pair, see ``remember_number``.
+    _number = None
+
+    _javascript_input = string.Template("""
 jQuery(function(jq){
   if (jQuery().selectpicker) {
     jq('#${id}-unit').selectpicker({});
   }
 });
-    """
+    """)
 
     @property
     def unit_dimension(self):
@@ -73,32 +148,62 @@ jQuery(function(jq){
 
     @property
     def widget_value(self):
-        """Return the converted value."""
+        """Return the converted value, see ``convert_value``."""
+        return self.convert_value()
+
+    def convert_value(self):
+        """Convert the value to its best unit, select the unit and return
+        the converted value.
+
+        The result is cached on the widget as long as ``value``,
+        ``ignoreContext`` and the submitted unit don't change.
+        """
+        key = (
+            self.value,
+            self.ignoreContext,
+            self.request.get(self.name + '-unit'),
+        )
+        if self._cache is not None and self._cache[0] == key:
+            key, self.unit, self.unit_system, value = self._cache
+            return value
+        value = self._widget_value()
+        self._cache = (key, self.unit, self.unit_system, value)
+        return value
+
+    def _widget_value(self):
         self.unit = self.request.get(self.name + '-unit', self.preferred_unit)
+        # Don't keep the unit system of a previous value.
+        self.unit_system = None
         if not self.value:
             return
 
         try:
-            base_unit = getattr(ureg, self.base_unit)
+            self._check_unit(self.base_unit)
         except UndefinedUnitError:
             value = self.value
         else:
             # Do the conversion
-            converter = IDataConverter(self)
-            try:
-                value = converter.toFieldValue(self.value)
-            except:
-                return self.value
+            converter = self.data_converter()
             system = None
             if not self.ignoreContext:
                 system = self._get_unit_annotation()
             else:
-                if self.unit in interfaces.METRICS:
-                    system = interfaces.SYSTEM_METRIC
-                elif self.unit in interfaces.IMPERIALS:
-                    system = interfaces.SYSTEM_IMPERIAL
+                system = utils.system_for_unit(self.unit)
             if not system in self.unit_systems:
                 system = self.preferred_system
+            key = None
+            if self.format_cache:
+                key = self._format_key(system, converter)
+                formatted = FORMAT_CACHE.get(key)
+                if formatted is not None:
+                    self.unit_system = system
+                    value, self.unit = formatted
+                    return value
+            try:
+                value = converter.toFieldValue(self.value)
+            except:
+                return self.value
+            self.unit_system = system
             self.unit = utils.get_best_unit(
                 value,
                 system,
@@ -106,22 +211,68 @@ jQuery(function(jq){
                 level_min=self.level_min,
                 level_max=self.level_max,
             )[0]
-            unit = getattr(ureg, self.unit)
-            value = value * base_unit
-            value = value.to(unit).magnitude
+            value = self._convert(value, self.base_unit, self.unit)
             if isinstance(value, Decimal):
                 value = value.quantize(interfaces.TWOPLACES)
-            value = converter.toWidgetValue(value)
+            if interfaces.IUnitDataConverter.providedBy(converter):
+                # The displayed value must not be taken for the field value.
+                value = converter.format(value)
+            else:
+                value = converter.toWidgetValue(value)
+            if key is not None:
+                FORMAT_CACHE.set(key, (value, self.unit))
         return value
 
+    def _format_key(self, system, converter):
+        """Return the key of the widget value in ``FORMAT_CACHE``.
+
+        The key contains the text of the value instead of the parsed number,
+        it is cheaper to hash and needs no parsing.
+        """
+        locale_id = self.request.locale.id
+        return (
+            self.value,
+            type(self),
+            self.base_unit,
+            type(converter),
+            # Quantity converters return a Decimal or a float.
+            _number_type(converter),
+            self.unit_dimension,
+            system,
+            self.level_min,
+            self.level_max,
+            (locale_id.language, locale_id.territory, locale_id.variant),
+        )
+
+    def data_converter(self):
+        """Return the data converter of the widget.
+
+        The converter is looked up once per widget and field.
+        """
+        converter = self._converter
+        if converter is None or converter.field is not self.field:
+            converter = self._converter = IDataConverter(self)
+        return converter
+
     def render(self):
         if HAS_BS_SELECT:
             bootstrap_select.need()
+        if self.mode == DISPLAY_MODE and display.use_fast_display(self):
+            return display.render_display(self)
         return super(MultiUnitWidget, self).render()
 
     def extract(self, default=NO_VALUE):
         value = self.request.get(self.name, default)
-        converter = IDataConverter(self)
+        converter = self.data_converter()
+        quantity = self._parse_quantity(value)
+        if quantity is not None:
+            # A value entered with units, converted to the base unit.
+            c_value, unit_name = quantity
+            if _number_type(converter) is float:
+                c_value = float(c_value)
+            self._select_unit(unit_name)
+            return converter.toWidgetValue(c_value)
+
         try:
             c_value = converter.toFieldValue(value)
         except:
@@ -129,36 +280,102 @@ jQuery(function(jq){
 
         unit_name = self.request.get(self.name + '-unit')
         if unit_name and unit_name != self.base_unit:
+            # Do the conversion
             try:
-                unit = getattr(ureg, unit_name)
-                base_unit = getattr(ureg, self.base_unit)
+                c_value = self._convert(c_value, unit_name, self.base_unit)
             except UndefinedUnitError:
                 c_value = self.field.get(self.context)
-
-            # Do the conversion
-            try:
-                c_value = c_value * unit
             except TypeError:
                 return value
-            else:
-                c_value = c_value.to(base_unit).magnitude
-            if not self.ignoreContext:
-                self._set_unit_annotation(unit_name)
+            self._select_unit(unit_name)
             value = converter.toWidgetValue(c_value)
 
         return value
 
-    def _get_unit_annotation(self):
-        context = self.context
-        if isinstance(context, Proxy):
-            context = removeSecurityProxy(context)
+    def _parse_quantity(self, value):
+        """Parse a value entered with units, e.g. ``12 ft 3 in``.
+
+        Return a tuple of the magnitude in the base unit and the first unit
+        or ``None``.
+        """
+        if not isinstance(value, string_types) or not value.strip():
+            return None
+        symbols = self.request.locale.numbers.symbols
         try:
-            annotations = IAnnotations(context)
-        except:
+            return parser.parse(
+                value,
+                self.unit_dimension,
+                decimal=symbols.get('decimal', u'.'),
+                group=symbols.get('group', u','),
+            )
+        except (KeyError, ValueError):
             return None
-        else:
-            storage = annotations.get(KEY, {})
-            return storage.get(self.name)
+
+    def _select_unit(self, unit_name):
+        """Remember the unit system of a submitted unit."""
+        if not self.ignoreContext:
+            self._pending_unit = unit_name
+            if not self._defer_unit_system():
+                self.store_unit_system()
+
+    def _check_unit(self, unit):
+        """Raise an ``UndefinedUnitError`` if ``unit`` is not known."""
+        if not conversion.has_unit(unit):
+            getattr(ureg, unit)
+
+    def _convert(self, value, from_unit, to_unit):
+        """Convert ``value`` between two units.
+
+        The precomputed conversion table is used for all units of
+        ``interfaces.UNITS``. The ratios of other units are resolved with
+        pint once, see ``conversion.convert_any``.
+        """
+        return conversion.convert_any(value, from_unit, to_unit)
+
+    def remember_number(self, text, number):
+        """Remember the number a text was converted from or to.
+
+        Data converters keep the precision of the field value this way, the
+        text is not parsed again.
+        """
+        if text and number is not None:
+            self._number = (text, number)
+
+    def remembered_number(self, text):
+        """Return the number remembered for a text or ``None``."""
+        number = self._number
+        if number is not None and number[0] == text:
+            return number[1]
+        return None
+
+    def _defer_unit_system(self):
+        """Check if the form stores the unit system when applying changes."""
+        form = getattr(self, 'form', None)
+        # Groups are applied by their parent form.
+        return interfaces.IUnitForm.providedBy(form) or \
+            interfaces.IUnitForm.providedBy(getattr(form, 'parentForm', None))
+
+    def store_unit_system(self):
+        """Store the unit system of the last extracted unit.
+
+        Forms providing ``interfaces.IUnitForm`` call this when the changes
+        are applied, so validating a form doesn't write to the database.
+        """
+        if self._pending_unit is not None:
+            self._set_unit_annotation(self._pending_unit)
+            self._pending_unit = None
+
+    # The unit systems of the context, set by forms reading them for all
+    # widgets at once (see ``form.prefetch_unit_systems``).
+    prefetched_unit_systems = None
+
+    def _get_unit_annotation(self):
+        storage = self.prefetched_unit_systems
+        if storage is None:
+            storage = get_unit_systems(self.context)
+        if storage is None:
+            return None
+        return storage.get(self.name)
 
     def _set_unit_annotation(self, unit):
         context = self.context
@@ -169,23 +386,51 @@ jQuery(function(jq){
         except:
             return None
         else:
+            system = utils.system_for_unit(unit)
             storage = annotations.get(KEY)
-            if storage is None:
-                storage = annotations[KEY] = PersistentDict({})
+            if storage is not None and storage.get(self.name) == system:
+                # Avoid needless writes (and conflicts).
+                return
+            if not isinstance(storage, UnitSystems):
+                storage = annotations[KEY] = UnitSystems(storage or {})
             # Store the unit system
-            storage[self.name] = utils.system_for_unit(unit)
+            storage[self.name] = system
+            if self.prefetched_unit_systems is not None:
+                self.prefetched_unit_systems[self.name] = system
+            self._cache = None
 
     def javascript_input(self):
-        return string.Template(self._javascript_input).substitute(dict(
-            id=self.id,
-        ))
+        if javascript.use_aggregation(self) and javascript.register(
+                self.request, self.id, convert=self.client_conversion):
+            return None
+        template = self._javascript_input
+        if not isinstance(template, string.Template):
+            # Subclasses may still define the script as a string.
+            template = string.Template(template)
+        script = template.substitute(id=self.id)
+        if self.client_conversion:
+            script = script.rstrip() + u'\n' + javascript.convert_script(
+                self.request, [self.id])
+        return script
+
+    def unit_factors(self):
+        """Return the JSON factor table for the browser or ``None``."""
+        if not self.client_conversion:
+            return None
+        return conversion.get_factor_table(self.unit_dimension)
+
+    def number_symbol(self, name):
+        """Return a number symbol (``decimal``, ``group``) of the locale."""
+        if not self.client_conversion:
+            return None
+        return self.request.locale.numbers.symbols.get(name)
 
     def isSelected(self, key):
         return key == self.unit
 
     @property
     def base_unit(self):
-        raise NotImplementedError
+        return interfaces.BASE_UNITS[self.unit_dimension]
 
     @property
     def preferred_unit(self):
@@ -193,8 +438,120 @@ jQuery(function(jq){
             self.preferred_system, {}
         ).get(self.unit_dimension, [(None,)])[0][0]
 
-    def items(self):
+    def _options_key(self, language):
+        return (
+            language,
+            self.unit_dimension,
+            tuple(self.unit_systems),
+            self.level_min,
+            self.level_max,
+        )
+
+    def _cached_options(self, language):
+        key = self._options_key(language)
+        options = OPTIONS_CACHE.get(key)
+        if options is None:
+            options = self._options(language)
+            OPTIONS_CACHE.set(key, options)
+        return options
+
+    def items(self, language=None):
+        """Return the unit options grouped by unit system.
+
+        The translated options are shared by all widgets, only the
+        ``selected`` flag is computed for every widget. ``language``
+        defaults to the language negotiated from the request.
+        """
+        if language is None:
+            language = negotiate_language(self.request)
+        options = self._cached_options(language)
         items = []
+        for title, units in options:
+            members = []
+            for unit in units:
+                member = dict(unit)
+                member['selected'] = self.isSelected(unit['id'])
+                members.append(member)
+            items.append({
+                'title': title,
+                'member': members,
+            })
+        return items
+
+    def options_markup(self, language=None):
+        """Return the rendered option groups of the unit select.
+
+        The markup is built from ``items`` and cached for the options and
+        the selected unit, so the template doesn't need to loop over them.
+        The markup of widgets overriding ``items`` or ``isSelected`` is not
+        cached. Return ``None`` if ``select_cache`` is disabled.
+
+        Without ``language`` the unit of the value is selected and the
+        language is negotiated from the request. Otherwise the markup is
+        rendered for ``language`` and the current ``unit`` (e.g. to warm
+        the cache without a request).
+        """
+        if not self.select_cache:
+            return None
+        if language is None:
+            # Select the unit of the value first.
+            self.convert_value()
+            language = negotiate_language(self.request)
+        if not self._default_options():
+            return self._options_markup(language)
+        key = self._options_key(language) + (self.unit,)
+        markup = SELECT_CACHE.get(key)
+        if markup is None:
+            markup = self._options_markup(language)
+            SELECT_CACHE.set(key, markup)
+        return markup
+
+    def _default_options(self):
+        """Check if the options are the ones of ``MultiUnitWidget``, selected
+        by ``unit``. Only their markup can be cached.
+        """
+        for name in ('items', 'isSelected'):
+            if _defined_by(self, name) is not MultiUnitWidget:
+                return False
+        return True
+
+    def _translate(self, text, language):
+        if isinstance(text, Message):
+            return translate(
+                text, context=self.request, target_language=language)
+        return text
+
+    def _options_markup(self, language):
+        groups = []
+        for item in self.items(language):
+            title = self._translate(item.get('title'), language)
+            options = []
+            for member in item['member']:
+                selected = u''
+                if member['selected']:
+                    selected = u' selected="selected"'
+                subtext = self._translate(member.get('subtext'), language)
+                if subtext is not None:
+                    subtext = u' data-subtext="%s"' % (
+                        display.escape_attribute(subtext))
+                options.append(
+                    u'<option id="%s" value="%s"%s%s>%s</option>' % (
+                        display.escape_attribute(member['id']),
+                        display.escape_attribute(member['value']),
+                        selected,
+                        subtext or u'',
+                        display.escape(
+                            self._translate(member['content'], language)),
+                    ))
+            label = u''
+            if title is not None:
+                label = u' label="%s"' % display.escape_attribute(title)
+            groups.append(u'<optgroup%s>%s</optgroup>' % (
+                label, u''.join(options)))
+        return u''.join(groups)
+
+    def _options(self, language=None):
+        options = []
         for system in self.unit_systems:
             dimensions = interfaces.UNITS.get(system, None)
             if not dimensions:
@@ -208,29 +565,35 @@ jQuery(function(jq){
             available_units = available_units[self.level_min:level_max]
             for unit in available_units:
                 abbr, label_short, label, info = unit
-                subtext = translate(label, context=self.request)
+                subtext = translate(
+                    label, context=self.request, target_language=language)
                 if info:
-                    info = translate(info, context=self.request)
+                    info = translate(
+                        info, context=self.request, target_language=language)
                     subtext = subtext + ' (%s)' % info
                 units.append({
                     'id': abbr,
                     'value': abbr,
                     'content': label_short,
                     'subtext': subtext,
-                    'selected': self.isSelected(abbr),
                 })
+            options.append((interfaces.LABELS.get(system), units))
+        return options
+
+    def unit_label(self):
+        return interfaces.UNITS_BY_ID.get(self.unit, interfaces.UNIT_NONE)[1]
 
-            item = {}
-            item['title'] = interfaces.LABELS.get(system)
-            item['member'] = units
-            items.append(item)
 
-        return items
+def _defined_by(widget, name):
+    """Return the class defining the attribute ``name`` of a widget.
 
-    def unit_label(self):
-        unit = [unit for unit in interfaces.ALL_UNITS if unit[0] == self.unit]
-        unit = unit and unit.pop() or interfaces.UNIT_NONE
-        return unit[1]
+    Return ``None`` if it is set on the widget itself.
+    """
+    if name in getattr(widget, '__dict__', {}):
+        return None
+    for klass in type(widget).__mro__:
+        if name in klass.__dict__:
+            return klass
 
 
 class AreaWidget(MultiUnitWidget):
@@ -273,3 +636,28 @@ class LengthWidget(MultiUnitWidget):
 def LengthFieldWidget(field, request):
     """Factory for LengthWidget"""
     return FieldWidget(field, LengthWidget(request))
+
+
+class QuantityWidget(MultiUnitWidget):
+    """Unit widget for the dimension of a quantity field."""
+    implementsOnly(interfaces.IUnitWidget)
+    klass = u'quantity-widget unit-widget'
+
+    @property
+    def unit_dimension(self):
+        return self.field.dimension
+
+
+# Widgets used for the quantity fields of known dimensions.
+QUANTITY_WIDGETS = {
+    interfaces.DIMENSION_AREA: AreaWidget,
+    interfaces.DIMENSION_LENGTH: LengthWidget,
+}
+
+
+@adapter(interfaces.IQuantity, IFormLayer)
+@implementer(IFieldWidget)
+def QuantityFieldWidget(field, request):
+    """Factory for the unit widget of a quantity field."""
+    factory = QUANTITY_WIDGETS.get(field.dimension, QuantityWidget)
+    return FieldWidget(field, factory(request))
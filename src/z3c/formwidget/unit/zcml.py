@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""ZCML directives for z3c.formwidget.unit."""
+
+# python imports
+import logging
+import os
+
+# zope imports
+from zope.component.interface import provideInterface
+from zope.configuration.fields import Path, Tokens
+from zope.i18n import zcml as i18n_zcml
+from zope.i18n.interfaces import ITranslationDomain
+from zope.interface import Interface
+from zope.schema import ASCIILine, Bool, Float, TextLine
+
+# local imports
+from z3c.formwidget.unit import catalogs, utils, warmup
+from z3c.formwidget.unit.i18n import _, LazyGettextMessageCatalog
+
+
+logger = logging.getLogger('z3c.formwidget.unit')
+
+
+class IUnitLadderDirective(Interface):
+    """Register the units of a unit system and dimension."""
+
+    system = ASCIILine(
+        title=_(u'Unit system'),
+        description=_(u'The unit system, e.g. "metric".'),
+        required=True,
+    )
+
+    dimension = ASCIILine(
+        title=_(u'Dimension'),
+        description=_(u'The dimension, e.g. "volume".'),
+        required=True,
+    )
+
+    units = Tokens(
+        title=_(u'Units'),
+        description=_(u'The unit ids, ordered by level.'),
+        value_type=ASCIILine(),
+        required=True,
+    )
+
+    thresholds = Tokens(
+        title=_(u'Thresholds'),
+        description=_(
+            u'The upper bounds (in the base unit) of all levels but the last '
+            u'one.'
+        ),
+        value_type=Float(),
+        required=False,
+    )
+
+    base_unit = ASCIILine(
+        title=_(u'Base unit'),
+        description=_(u'The unit values of the dimension are stored in.'),
+        required=False,
+    )
+
+
+def unitLadder(_context, system, dimension, units, thresholds=(),
+               base_unit=None):
+    _context.action(
+        discriminator=('unitLadder', system, dimension),
+        callable=utils.register_ladder,
+        args=(system, dimension, units, thresholds, base_unit),
+    )
+
+
+class ILazyTranslationsDirective(Interface):
+    """Register translations which are loaded on first use."""
+
+    directory = Path(
+        title=_(u'Directory'),
+        description=_(u'The directory containing the translations.'),
+        required=True,
+    )
+
+    domain = TextLine(
+        title=_(u'Domain'),
+        description=_(
+            u'The translation domain to register. All domains found in the '
+            u'directory are registered if not specified.'
+        ),
+        required=False,
+    )
+
+    languages = Tokens(
+        title=_(u'Languages'),
+        description=_(u'Only register these languages.'),
+        value_type=ASCIILine(),
+        required=False,
+    )
+
+
+def lazyTranslations(_context, directory, domain=None, languages=()):
+    """Like ``i18n:registerTranslations``, but the ``.mo`` files are read
+    when a language is used for the first time."""
+    domains = {}
+    for language, name, po_path, mo_path in catalogs.find_catalogs(
+            os.path.normpath(directory)):
+        if domain is not None and name != domain:
+            continue
+        if languages and language not in languages:
+            continue
+        if not i18n_zcml.allow_language(language):
+            continue
+        if catalogs.is_outdated(po_path, mo_path):
+            logger.warning(
+                'Outdated catalog %s, run "python -m '
+                'z3c.formwidget.unit.catalogs".', po_path)
+        if not os.path.exists(mo_path):
+            continue
+        domains.setdefault(name, []).append(
+            LazyGettextMessageCatalog(language, name, mo_path))
+
+    for name, domain_catalogs in sorted(domains.items()):
+        _context.action(
+            discriminator=None,
+            callable=i18n_zcml.handler,
+            args=(domain_catalogs, name),
+        )
+    _context.action(
+        discriminator=None,
+        callable=provideInterface,
+        args=(ITranslationDomain.__module__ + '.' +
+              ITranslationDomain.getName(), ITranslationDomain),
+    )
+
+
+class IPrewarmDirective(Interface):
+    """Build the caches of the unit widgets at startup."""
+
+    languages = Tokens(
+        title=_(u'Languages'),
+        description=_(u'Translate the unit options for these languages.'),
+        value_type=ASCIILine(),
+        required=False,
+    )
+
+    templates = Bool(
+        title=_(u'Templates'),
+        description=_(u'Compile the templates of the unit widgets.'),
+        default=True,
+        required=False,
+    )
+
+
+def prewarm(_context, languages=(), templates=True):
+    # Run after all other actions, the templates and units are registered.
+    _context.action(
+        discriminator=('prewarm',),
+        callable=warmup.prewarm,
+        args=(languages, templates),
+        order=1000,
+    )